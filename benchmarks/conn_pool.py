@@ -0,0 +1,73 @@
+"""Connect-per-call vs pooled connections on ship point lookups.
+
+The connect-per-call loop opens, commits and closes a plain sqlite3
+connection per lookup, as conn_db did before pooling; the pooled loop
+runs the same query through get_cursor.
+
+Run from the project root: python -m benchmarks.conn_pool
+"""
+
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from db.conn_db import get_cursor, pool
+from db.create_db import Tables
+
+SHIPS = 200
+LOOKUPS = 5000
+
+
+def prepare_db(db_name: str) -> None:
+    with get_cursor(db_name) as cursor:
+        for table in Tables:
+            cursor.execute(table.value)
+        cursor.executemany(
+            "INSERT INTO ships VALUES (?, ?, ?, ?)",
+            [(f"Ship-{i}", "Weapon-1", "Hull-1", "Engine-1") for i in range(SHIPS)],
+        )
+
+
+FIND_SHIP = "SELECT * FROM ships WHERE ship = ?"
+
+
+def run_unpooled_lookups(db_name: str) -> float:
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        conn = sqlite3.connect(db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(FIND_SHIP, (f"Ship-{i % SHIPS}",)).fetchone()
+            cursor.close()
+            conn.commit()
+        finally:
+            conn.close()
+    return time.perf_counter() - start
+
+
+def run_pooled_lookups(db_name: str) -> float:
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        with get_cursor(db_name, read_only=True) as cursor:
+            cursor.execute(FIND_SHIP, (f"Ship-{i % SHIPS}",)).fetchone()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = str(Path(tmp_dir) / "bench.db")
+        prepare_db(db_name)
+
+        unpooled = run_unpooled_lookups(db_name)
+        pooled = run_pooled_lookups(db_name)
+        pool.close_all()
+
+    print(f"{LOOKUPS} lookups")
+    print(f"connect-per-call: {unpooled:.3f}s ({LOOKUPS / unpooled:,.0f} ops/s)")
+    print(f"pooled:           {pooled:.3f}s ({LOOKUPS / pooled:,.0f} ops/s)")
+    print(f"speedup:          {unpooled / pooled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Cost of every database stage for fleets of growing size.
+
+Stages: create_db, seed_db (with the migrate_db indexes), create_tmp_db,
+randomize (both bulk updates) and point lookups through
+ShipRepository/ComponentRepository. Each fleet
+runs in its own process with WOW_*_COUNT set, so the counts in config
+apply everywhere and peak RSS isn't inherited from a smaller fleet.
+Component counts scale with the ships as in the default 200 ship fleet.
+
+Run from the project root:
+    python -m benchmarks.db_stages --ships 200 10000 1000000
+    python -m benchmarks.db_stages --compare benchmarks/results/<commit>.json
+
+Results are written as JSON (default: benchmarks/results/<commit>.json);
+--compare prints the ops/s change of every stage against earlier results.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from config import (
+    ENGINES_COUNT,
+    HULLS_COUNT,
+    PROJECT_ROOT,
+    SHIPS_COUNT,
+    WEAPONS_COUNT,
+)
+from db.conn_db import pool
+from db.create_db import create_db, migrate_db
+from db.repository import ComponentRepository, ShipRepository
+from db.seed_db import seed_db
+from db.tmp_db import create_tmp_db
+from db.utils import DataGenerator, drop_db_if_exists
+from tests.randomize import RandomizeDatabase
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks" / "results"
+DEFAULT_SHIPS = [200, 10_000, 100_000]
+LOOKUPS = 10_000
+RSS_SAMPLE_INTERVAL = 0.005
+
+# components per ship of the default fleet: 20 weapons, 5 hulls, 6 engines
+DEFAULT_FLEET = {"ships": 200, "weapons": 20, "hulls": 5, "engines": 6}
+
+
+def fleet_counts(ships: int) -> dict[str, int]:
+    return {
+        name: max(count, count * ships // DEFAULT_FLEET["ships"])
+        for name, count in DEFAULT_FLEET.items()
+    }
+
+
+def _current_rss() -> int:
+    """Resident set size in bytes, the peak so far where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRss:
+    """Highest resident set size seen while the block runs"""
+
+    def __enter__(self) -> "PeakRss":
+        self.peak = _current_rss()
+        self._done = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._done.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _current_rss())
+
+    def __exit__(self, *exc_info) -> None:
+        self._done.set()
+        self._sampler.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(
+    run: Callable[[], None], ops: int, repeat: int = 1, setup: Callable | None = None
+) -> dict:
+    """Time `repeat` runs of a stage doing `ops` operations each"""
+    samples = []
+    with PeakRss() as rss:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - start)
+    return _stats(samples, ops * repeat, rss.peak)
+
+
+def measure_calls(func: Callable, calls: list[tuple]) -> dict:
+    """Time every call of `func` separately, for per-operation latencies"""
+    samples = []
+    with PeakRss() as rss:
+        for args in calls:
+            start = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - start)
+    return _stats(samples, len(calls), rss.peak)
+
+
+def _stats(samples: list[float], ops: int, peak_rss: int) -> dict:
+    return {
+        "ops": ops,
+        "seconds": sum(samples),
+        "ops_per_sec": ops / sum(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "peak_rss_mb": peak_rss / 2**20,
+    }
+
+
+def run_fleet(repeat: int) -> dict:
+    """All stages for the fleet configured by WOW_*_COUNT; runs in a child"""
+    rows = SHIPS_COUNT + WEAPONS_COUNT + HULLS_COUNT + ENGINES_COUNT
+    lookups = random.Random(0)
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = str(Path(tmp_dir) / "bench.db")
+        tmp_db_name = str(Path(tmp_dir) / "temp_bench.db")
+
+        def recreate_db() -> None:
+            drop_db_if_exists(db_name)
+            create_db(db_name)
+
+        stages["create_db"] = measure(
+            lambda: create_db(db_name),
+            ops=1,
+            repeat=repeat,
+            setup=lambda: drop_db_if_exists(db_name),
+        )
+
+        def seed() -> None:
+            seed_db(db_name, DataGenerator(0, stream="seed"))
+            migrate_db(db_name)
+
+        stages["seed_db"] = measure(
+            seed,
+            ops=rows,
+            repeat=repeat,
+            setup=recreate_db,
+        )
+        stages["create_tmp_db"] = measure(
+            lambda: create_tmp_db(db_name, tmp_db_name, progress=None),
+            ops=rows,
+            repeat=repeat,
+        )
+
+        def randomize() -> None:
+            randomize_db = RandomizeDatabase(
+                tmp_db_name, DataGenerator(0, stream="randomize")
+            )
+            with pool.use_profile("bulk-load"):
+                randomize_db.randomize_ships()
+                randomize_db.randomize_components()
+
+        stages["randomize"] = measure(randomize, ops=rows, repeat=repeat)
+
+        stages["ship_lookup"] = measure_calls(
+            ShipRepository.find_by_id,
+            [
+                (db_name, f"Ship-{lookups.randint(1, SHIPS_COUNT)}")
+                for _ in range(LOOKUPS)
+            ],
+        )
+        stages["component_lookup"] = measure_calls(
+            ComponentRepository.find_by_id,
+            [
+                (
+                    db_name,
+                    "weapons",
+                    "weapon",
+                    f"Weapon-{lookups.randint(1, WEAPONS_COUNT)}",
+                )
+                for _ in range(LOOKUPS)
+            ],
+        )
+        pool.close_all()
+
+    return stages
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_in_child(ships: int, repeat: int) -> dict:
+    counts = fleet_counts(ships)
+    env = os.environ | {
+        f"WOW_{name.upper()}_COUNT": str(count) for name, count in counts.items()
+    }
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.db_stages",
+            "--child",
+            "--repeat",
+            str(repeat),
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {"fleet": counts, "stages": json.loads(result.stdout)}
+
+
+def print_results(results: dict, baseline: dict | None = None) -> None:
+    baseline = baseline or {}
+    baseline_runs = {
+        run["fleet"]["ships"]: run["stages"] for run in baseline.get("runs", [])
+    }
+    for run in results["runs"]:
+        print(f"\n{run['fleet']}")
+        previous = baseline_runs.get(run["fleet"]["ships"], {})
+        for stage, stats in run["stages"].items():
+            line = (
+                f"  {stage:<17}{stats['ops_per_sec']:>14,.0f} ops/s"
+                f"  p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms"
+                f"  peak RSS {stats['peak_rss_mb']:>7.1f} MB"
+            )
+            if stage in previous:
+                change = stats["ops_per_sec"] / previous[stage]["ops_per_sec"] - 1
+                line += f"  {change:+.1%} vs {baseline['commit']}"
+            print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--ships", type=int, nargs="+", default=DEFAULT_SHIPS)
+    parser.add_argument("--repeat", type=int, default=3, help="runs of bulk stages")
+    parser.add_argument("--output", type=Path, help="JSON file for the results")
+    parser.add_argument("--compare", type=Path, help="earlier JSON results")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_fleet(args.repeat)))
+        return
+
+    commit = _commit()
+    results = {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "lookups": LOOKUPS,
+        "repeat": args.repeat,
+        "runs": [run_in_child(ships, args.repeat) for ships in args.ships],
+    }
+
+    output = args.output or RESULTS_DIR / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_results(results, baseline)
+    print(f"\nresults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
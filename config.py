@@ -1,23 +1,109 @@
+import os
 from pathlib import Path
 
-# Database configuration
-DB_NAME = "WoW.db"
-TEMP_DB_NAME = "temp_" + DB_NAME
+# pytest-xdist worker id ("gw0", "gw1", ...), empty outside of parallel runs
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "")
+WORKER_SUFFIX = f"_{WORKER_ID}" if WORKER_ID else ""
 
-# Component counts
-WEAPONS_COUNT = 20
-HULLS_COUNT = 5
-ENGINES_COUNT = 6
-SHIPS_COUNT = 200
+# Database storage: "file" keeps databases on disk, "memory" keeps them in
+# shared-cache in-memory databases alive while the connection pool holds them
+DB_STORAGE = os.environ.get("WOW_DB_STORAGE", "file")
+
+# Database configuration, one pair of databases per worker
+if DB_STORAGE == "memory":
+    DB_NAME = f"file:WoW{WORKER_SUFFIX}?mode=memory&cache=shared"
+    TEMP_DB_NAME = f"file:temp_WoW{WORKER_SUFFIX}?mode=memory&cache=shared"
+else:
+    DB_NAME = f"WoW{WORKER_SUFFIX}.db"
+    TEMP_DB_NAME = "temp_" + DB_NAME
+
+# Change data capture: log changes of the temporary database to its changelog
+# table and only compare the logged rows
+CDC_ENABLED = os.environ.get("WOW_CDC") == "1"
+
+# Row digests and Merkle trees kept next to the data (see db.digest)
+DIGESTS_ENABLED = os.environ.get("WOW_DIGESTS") == "1"
+DIGEST_BUCKETS = 256
+
+# SQLite PRAGMA profiles applied to pooled connections (see ConnectionPool.use_profile).
+# journal_mode is stored in the database file; WAL and mmap_size have no effect
+# on in-memory databases
+DB_PROFILES: dict[str, dict[str, str | int]] = {
+    # SQLite defaults, the write behaviour of connections without a profile
+    "durable": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "foreign_keys": "OFF",
+    },
+    # seeding and randomizing: no fsync, rollback journal kept in memory
+    "bulk-load": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "mmap_size": 0,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "foreign_keys": "OFF",
+    },
+    # comparing databases: readers don't block on WAL, pages are memory-mapped
+    "read-heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268_435_456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+        "foreign_keys": "OFF",
+    },
+}
+DB_PROFILE = os.environ.get("WOW_DB_PROFILE", "durable")
+
+# Per-statement timings and connection counters (see db.metrics), dumped to
+# METRICS_FILE .json/.prom at the end of the test session
+METRICS_ENABLED = os.environ.get("WOW_DB_METRICS") == "1"
+
+# Maximum number of idle pooled connections kept per database
+POOL_MAX_SIZE = 4
+
+# Pages copied per step of the SQLite backup API, -1 copies everything at once
+BACKUP_PAGES_PER_STEP = 1024
+
+# Component counts, overridable e.g. to benchmark large fleets
+WEAPONS_COUNT = int(os.environ.get("WOW_WEAPONS_COUNT", 20))
+HULLS_COUNT = int(os.environ.get("WOW_HULLS_COUNT", 5))
+ENGINES_COUNT = int(os.environ.get("WOW_ENGINES_COUNT", 6))
+SHIPS_COUNT = int(os.environ.get("WOW_SHIPS_COUNT", 200))
+
+# Rows generated and inserted per executemany call while seeding
+SEED_CHUNK_SIZE = 10_000
+
+# Rows fetched per fetchmany call by the repositories' iter_all
+FETCH_BATCH_SIZE = 10_000
 
 # Parameter value ranges
 MIN_PARAM_VALUE = 1
 MAX_PARAM_VALUE = 20
 
+# Seed of the generated data, None picks a new one per run (see pytest --seed)
+RANDOM_SEED: int | None = None
+
+# Components cached per database by ComponentService, TTL in seconds (None: no TTL)
+COMPONENT_CACHE_SIZE = 1024
+COMPONENT_CACHE_TTL: float | None = None
+
 # Component types
 COMPONENTS = ["weapon", "hull", "engine"]
 
 # paths
 PROJECT_ROOT = Path(__file__).parent
 LOGS_DIR = PROJECT_ROOT / "logs"
-LOG_FILE = LOGS_DIR / "WoW.log"
+LOG_FILE = LOGS_DIR / f"WoW{WORKER_SUFFIX}.log"
+METRICS_FILE = LOGS_DIR / f"db_metrics{WORKER_SUFFIX}"
+# --profile-db output, see tests/profiling.py
+PROFILE_DIR = Path(os.environ.get("WOW_PROFILE_DIR", LOGS_DIR))
+PROFILE_FILE = PROFILE_DIR / f"db_profile{WORKER_SUFFIX}"
+
+# Seeded databases keyed by schema, counts and seed, oldest ones are pruned
+SEED_CACHE_DIR = PROJECT_ROOT / ".db_cache"
+SEED_CACHE_MAX_FILES = 8
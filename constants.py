@@ -11,6 +11,9 @@ COMPARE_PARAMS_FAIL_MESSAGE = (
 UNKNOWN_COMPONENT_MESSAGE = "Unknown component: '{comp}'"
 SHIP_NOT_FOUND_MESSAGE = "Ship not found: {ship_id}"
 COMPONENT_NOT_FOUND_MESSAGE = "Component not found: {comp_id}"
+UNKNOWN_PARAM_MESSAGE = "Unknown parameter '{param}' of {table}"
+INVALID_IDENTIFIER_MESSAGE = "Invalid SQL identifier: '{name}'"
+INVALID_ID_MESSAGE = "Invalid ID: '{value}', expected '{prefix}-<number>'"
 
 # DB errors
 DB_OPERATION_FAILED = "Database operation failed: {e}"
@@ -23,12 +26,39 @@ DB_ERROR = "Database error in {db_name}, transaction rolled back: {e}"
 UNEXPECTED_ERROR = "Unexpected error in {db_name}: {e}"
 CLOSED_CONNECTION = "Closed connection to {db_name}"
 CURSOR_ERROR = "Cursor error in {db_name}: {e}"
+POOL_CONNECTION_DISCARDED = "Discarded unhealthy pooled connection to {db_name}"
+POOL_CLOSED = "Closed {count} pooled connections to {db_name}"
+POOL_PROFILE_APPLIED = "Applied PRAGMA profile {profile} to connection to {db_name}"
+POOL_PRAGMA_FAILED = "PRAGMA {pragma} = {value} not applied to {db_name}: {e}"
+UNKNOWN_DB_PROFILE = "Unknown PRAGMA profile: {profile}"
+PROFILE_WRITTEN = "Session profile written to {path}.prof and {path}.txt"
+METRICS_DUMPED = "Database metrics written to {path}.json and {path}.prom"
 
 TABLE_CREATED = "Table {table} created successfully"
+SCHEMA_MIGRATED = "Migrated {db_name} to schema version {version}"
+CDC_INSTALLED = "Change data capture installed in {db_name}"
+DIGESTS_BUILT = "Row digests built for {db_name}"
+DIGESTS_COMPARED = "Digests of {db_name} and {other_db_name} differ in {count} rows"
 
-DB_SEEDING_START = "Starting database seeding"
+DB_SEEDING_START = "Starting database seeding with seed {seed}"
+DB_SEEDING_CHUNK = "Inserted {count} rows into {table}"
 DB_POPULATED_SUCCESSFULLY = "Database populated successfully"
 
+DB_BACKUP_PROGRESS = "Backup progress: {copied}/{total} pages"
+DB_BACKUP_COMPLETED = "Backed up database {db_name} in {elapsed:.3f}s"
+
+SEED_CACHE_HIT = "Restored seeded database {key} from {path}"
+SEED_CACHE_MISS = "Seeded database {key} not cached"
+SEED_CACHE_STORED = "Stored seeded database {key} in {path}"
+
+COLUMNAR_LOADED = (
+    "Loaded columnar snapshot of {db_name}: {ships} ships, {components} components"
+)
+VECTORIZED_COMPARE_COMPLETE = (
+    "Compared {db_name} with {other_db_name}: "
+    "{ships} changed ship components, {components} changed components"
+)
+
 TMP_DB_CREATED = "Created temporary database: {db_name}"
 TMP_DB_REMOVED = "Removed temporary database: {db_name}"
 
@@ -36,12 +66,18 @@ TMP_DB_REMOVED = "Removed temporary database: {db_name}"
 REPO_SHIP_FIND_START = "Finding ship by ID: {ship_id} in database: {db_name}"
 REPO_SHIP_FIND_SUCCESS = "Ship found: {ship_id}"
 REPO_SHIP_FIND_NOT_FOUND = "Ship not found: {ship_id} in database: {db_name}"
+REPO_SHIP_FIND_BY_COMPONENT = (
+    "Finding ships with {component} {component_id} in database: {db_name}"
+)
+REPO_SHIP_FIND_BY_COMPONENT_SUCCESS = "Found {count} ships with {component_id}"
 REPO_SHIP_FIND_ALL = "Retrieving all ships from database: {db_name}"
 REPO_SHIP_FIND_ALL_SUCCESS = "Retrieved {count} ships from database: {db_name}"
 REPO_SHIP_UPDATE = (
     "Updating ship {ship_id}: setting {component} to {component_id} in {db_name}"
 )
 REPO_SHIP_UPDATE_SUCCESS = "Successfully updated ship {ship_id}"
+REPO_SHIP_UPDATE_BULK = "Updating {count} ship components in {db_name}"
+REPO_SHIP_UPDATE_BULK_SUCCESS = "Successfully updated {count} ship components"
 REPO_COMPONENT_FIND_START = (
     "Finding component {component_type}: {component_id} in database: {db_name}"
 )
@@ -57,6 +93,19 @@ REPO_COMPONENT_UPDATE = (
     "Updating component {component_id}: setting {param_name} to {param_value}"
 )
 REPO_COMPONENT_UPDATE_SUCCESS = "Successfully updated component {component_id}"
+REPO_DIFF_SHIPS = (
+    "Finding changed ship components between {db_name} and {other_db_name}"
+)
+REPO_DIFF_COMPONENTS = "Finding changed {component_table} parameters in {other_db_name}"
+REPO_DIFF_FOUND = "Found {count} changed rows"
+REPO_CHANGELOG_FIND = "Reading changelog of {db_name} since sequence {since_seq}"
+REPO_CHANGELOG_FOUND = "Found {count} changelog entries"
+REPO_COMPONENT_UPDATE_BULK = (
+    "Updating {count} parameters in table: {component_table} in database: {db_name}"
+)
+REPO_COMPONENT_UPDATE_BULK_SUCCESS = (
+    "Successfully updated {count} parameters in {component_table}"
+)
 
 # Service logging
 SERVICE_GET_SHIP_START = "Service: Getting ship {ship_id} from {db_name}"
@@ -68,6 +117,11 @@ SERVICE_GET_COMPONENT_START = (
 SERVICE_GET_COMPONENT_SUCCESS = (
     "Service: Successfully retrieved component {component_id}"
 )
+SERVICE_SNAPSHOT_LOADED = (
+    "Service: Loaded snapshot of {db_name}: {ships} ships, {components} components"
+)
+SERVICE_COMPONENT_CACHE_HIT = "Service: Component {component_id} served from cache"
+SERVICE_COMPONENT_CACHE_STATS = "Service: Component cache: {hits} hits, {misses} misses"
 SERVICE_GET_COMPONENT_ERROR = "Service: Failed to get component {component_id}: {error}"
 SERVICE_COMPARE_SHIPS_START = "Service: Comparing {component_type} between ships"
 SERVICE_COMPARE_SHIPS_MATCH = (
@@ -91,6 +145,15 @@ SERVICE_UPDATE_SHIP = (
 SERVICE_UPDATE_COMPONENT = (
     "Service: Updating component {component_id} parameter {param_name}"
 )
+SERVICE_DIFF_START = "Service: Computing diff between {db_name} and {other_db_name}"
+SERVICE_DIFF_COMPLETE = (
+    "Service: Diff has {component_changes} component changes "
+    "and {param_changes} parameter changes"
+)
+SERVICE_UPDATE_SHIPS_BULK = "Service: Updating {count} ship components in bulk"
+SERVICE_UPDATE_COMPONENTS_BULK = (
+    "Service: Updating {count} {component_type} parameters in bulk"
+)
 
 # Test setup logging
 TEST_RANDOMIZE_SHIP_START = "Randomizing ship: {ship_id}"
@@ -103,8 +166,21 @@ TEST_RANDOMIZE_COMPONENT_COMPLETE = (
 )
 TEST_RANDOMIZE_ALL_SHIPS = "Randomizing ships"
 TEST_RANDOMIZE_ALL_COMPONENTS = "Randomizing {count} {component_type} components"
+TEST_RANDOM_SEED = "Random seed: {seed} (rerun with --seed {seed} to reproduce)"
 TEST_RANDOMIZE_TMP_DB_START = "Randomizing temporary database"
 TEST_RANDOMIZE_TMP_DB_COMPLETED = "Temporary database randomization completed"
 
+# Verification engine logging
+VERIFY_START = (
+    "Verifying {ships} ships of {other_db_name} against {db_name} "
+    "in {shards} shards with {workers} {executor} workers"
+)
+VERIFY_SHARD_COMPLETE = (
+    "Verified {ships} ships from {first} to {last}: {failures} failures"
+)
+VERIFY_COMPLETE = "Verified {checks} checks in {elapsed:.2f}s: {failures} failures"
+VERIFY_MEMORY_DB_PROCESSES = (
+    "In-memory database {db_name} can't be shared with worker processes"
+)
+
 COMPARE_COMPONENTS_IN_SHIP = "Compare components in ship: {ship_id}"
-COMPARE_PARAMS_IN_COMPONENT = "Compare parameters in component: {component_type}"
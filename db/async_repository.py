@@ -0,0 +1,88 @@
+"""asyncio-facing repositories.
+
+Every database gets a dedicated single-thread executor; the synchronous
+repository methods run on it, so awaiting them never blocks the event
+loop, and lookups in different databases run concurrently. A thread
+checks out one pooled connection at a time, and the pool hands the last
+released one back, so each thread keeps reusing its own connection.
+"""
+
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from db.repository import ComponentRepository, ShipRepository
+
+T = TypeVar("T")
+
+
+class DatabaseExecutors:
+    """One worker thread per database name, created on first use"""
+
+    def __init__(self):
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_name: str) -> ThreadPoolExecutor:
+        with self._lock:
+            executor = self._executors.get(db_name)
+            if executor is None:
+                executor = ThreadPoolExecutor(1, thread_name_prefix="db")
+                self._executors[db_name] = executor
+            return executor
+
+    async def run(self, db_name: str, func: Callable[..., T], *args) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get(db_name), func, db_name, *args)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+
+        for executor in executors:
+            executor.shutdown()
+
+
+executors = DatabaseExecutors()
+
+
+class AsyncShipRepository:
+    def __init__(self, db_executors: DatabaseExecutors = executors):
+        self.executors = db_executors
+
+    async def find_by_id(self, db_name: str, ship_id: str) -> tuple | None:
+        return await self.executors.run(db_name, ShipRepository.find_by_id, ship_id)
+
+    async def find_by_component(
+        self, db_name: str, component: str, component_id: str
+    ) -> list[tuple]:
+        return await self.executors.run(
+            db_name, ShipRepository.find_by_component, component, component_id
+        )
+
+    async def find_all(self, db_name: str) -> list[tuple]:
+        return await self.executors.run(db_name, ShipRepository.find_all)
+
+
+class AsyncComponentRepository:
+    def __init__(self, db_executors: DatabaseExecutors = executors):
+        self.executors = db_executors
+
+    async def find_by_id(
+        self, db_name: str, component_table: str, component_type: str, component_id: str
+    ) -> tuple | None:
+        return await self.executors.run(
+            db_name,
+            ComponentRepository.find_by_id,
+            component_table,
+            component_type,
+            component_id,
+        )
+
+    async def find_all(self, db_name: str, component_table: str) -> list[tuple]:
+        return await self.executors.run(
+            db_name, ComponentRepository.find_all, component_table
+        )
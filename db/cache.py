@@ -0,0 +1,134 @@
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+from contextlib import suppress
+from pathlib import Path
+
+from config import (
+    DB_NAME,
+    ENGINES_COUNT,
+    HULLS_COUNT,
+    MAX_PARAM_VALUE,
+    MIN_PARAM_VALUE,
+    SEED_CACHE_DIR,
+    SEED_CACHE_MAX_FILES,
+    SHIPS_COUNT,
+    WEAPONS_COUNT,
+)
+from constants import SEED_CACHE_HIT, SEED_CACHE_MISS, SEED_CACHE_STORED
+from db.conn_db import DatabaseError, conn_db, pool
+from db.create_db import SCHEMA_VERSION, Indexes, Tables, create_db, migrate_db
+from db.logger import lazy, logger
+from db.seed_db import generate_components, generate_ships, seed_db
+from db.tmp_db import backup_db
+from db.utils import DataGenerator, drop_db_if_exists
+
+
+def seeded_db_key(seed: int) -> str:
+    """Hash of everything that determines the content of a seeded database"""
+    digest = hashlib.sha256()
+    for ddl in (*Tables, *Indexes):
+        digest.update(ddl.value.encode())
+    for generator in (DataGenerator, generate_components, generate_ships, seed_db):
+        digest.update(inspect.getsource(generator).encode())
+    settings = {
+        "weapons": WEAPONS_COUNT,
+        "hulls": HULLS_COUNT,
+        "engines": ENGINES_COUNT,
+        "ships": SHIPS_COUNT,
+        "params": [MIN_PARAM_VALUE, MAX_PARAM_VALUE],
+        "schema_version": SCHEMA_VERSION,
+        "seed": seed,
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def cached_db_path(key: str) -> Path:
+    return SEED_CACHE_DIR / f"{key}.db"
+
+
+def restore_seeded_db(key: str, db_name: str = DB_NAME) -> bool:
+    """Copy a cached database to db_name. Parallel workers prune the cache,
+    a database removed before or while it is copied is a miss.
+    """
+    path = cached_db_path(key)
+    if not path.exists():
+        logger.info(lazy(SEED_CACHE_MISS, key=key))
+        return False
+
+    drop_db_if_exists(db_name)
+    try:
+        with conn_db(db_name) as target:
+            backup_db(str(path), target)
+    except DatabaseError:
+        drop_db_if_exists(db_name)
+        logger.info(lazy(SEED_CACHE_MISS, key=key))
+        return False
+    finally:
+        pool.close(str(path))
+
+    # mark as recently used, unless pruned meanwhile
+    with suppress(FileNotFoundError):
+        os.utime(path)
+
+    logger.info(lazy(SEED_CACHE_HIT, key=key, path=path))
+    return True
+
+
+def _mtime(path: Path) -> float:
+    """Modification time, 0 for files another worker has just removed"""
+    try:
+        return path.stat().st_mtime
+    except FileNotFoundError:
+        return 0
+
+
+def _prune_cache() -> None:
+    cached = sorted(SEED_CACHE_DIR.glob("*.db"), key=_mtime)
+    for path in cached[:-SEED_CACHE_MAX_FILES]:
+        path.unlink(missing_ok=True)
+
+
+def store_seeded_db(key: str, db_name: str = DB_NAME) -> None:
+    SEED_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = cached_db_path(key)
+    # write next to the target and rename, so parallel workers never see
+    # a partially copied database
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    target = sqlite3.connect(tmp_path)
+    try:
+        backup_db(db_name, target)
+    finally:
+        target.close()
+    os.replace(tmp_path, path)
+    _prune_cache()
+
+    logger.info(lazy(SEED_CACHE_STORED, key=key, path=path))
+
+
+def create_seeded_db(
+    db_name: str = DB_NAME, generator: DataGenerator | None = None, cache: bool = True
+) -> None:
+    """create_db + seed_db + migrate_db, served from the cache when nothing
+    has changed.
+    Only seeds that are reused are worth caching: without `cache` the
+    database is seeded directly and nothing is stored.
+    """
+    generator = generator or DataGenerator(stream="seed")
+    if not cache:
+        create_db(db_name)
+        seed_db(db_name, generator)
+        migrate_db(db_name)
+        return
+
+    key = seeded_db_key(generator.seed)
+    if restore_seeded_db(key, db_name):
+        return
+
+    create_db(db_name)
+    seed_db(db_name, generator)
+    migrate_db(db_name)
+    store_seeded_db(key, db_name)
@@ -0,0 +1,180 @@
+"""Array-backed storage of ships and components.
+
+Component IDs such as "Weapon-17" are stored as integers (17) and every
+parameter is an array column, so a ship costs a few bytes per column
+instead of a dataclass instance with four strings. Rows are exposed as
+views with the same item access as Ship and Component.
+"""
+
+from array import array
+from bisect import bisect_left
+
+from config import COMPONENTS, DB_NAME, FETCH_BATCH_SIZE
+from constants import COLUMNAR_LOADED, INVALID_ID_MESSAGE
+from db.logger import lazy, logger
+from db.models import COMPONENT_STRUCTURES, ComponentStructure
+from db.repository import ComponentRepository, ShipRepository
+
+# array typecodes: 4-byte signed integers for IDs and parameter values
+ID_TYPECODE = "i"
+VALUE_TYPECODE = "i"
+
+
+def encode_id(prefix: str, value: str) -> int:
+    """'Weapon-17' -> 17"""
+    name, _, number = value.rpartition("-")
+    if name != prefix or not number.isdigit():
+        raise ValueError(INVALID_ID_MESSAGE.format(value=value, prefix=prefix))
+    return int(number)
+
+
+def decode_id(prefix: str, number: int) -> str:
+    return f"{prefix}-{number}"
+
+
+def _sort_columns(ids: array, columns: list[array]) -> None:
+    """Sort ids in place and reorder the columns the same way"""
+    if all(ids[i] < ids[i + 1] for i in range(len(ids) - 1)):
+        return
+
+    order = sorted(range(len(ids)), key=ids.__getitem__)
+    ids[:] = array(ids.typecode, (ids[i] for i in order))
+    for column in columns:
+        column[:] = array(column.typecode, (column[i] for i in order))
+
+
+def _find(ids: array, number: int) -> int | None:
+    index = bisect_left(ids, number)
+    if index < len(ids) and ids[index] == number:
+        return index
+    return None
+
+
+class ShipRow:
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: "ShipColumns", index: int):
+        self._columns = columns
+        self._index = index
+
+    @property
+    def ship_id(self) -> str:
+        return decode_id("Ship", self._columns.ids[self._index])
+
+    def __getitem__(self, item: str) -> str:
+        if item == "ship_id":
+            return self.ship_id
+        number = self._columns.components[item][self._index]
+        return decode_id(item.capitalize(), number)
+
+
+class ComponentRow:
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: "ComponentColumns", index: int):
+        self._columns = columns
+        self._index = index
+
+    @property
+    def comp_id(self) -> str:
+        return decode_id(self._columns.prefix, self._columns.ids[self._index])
+
+    def keys(self) -> list[str]:
+        return ["comp_id", *self._columns.structure.params]
+
+    def __getitem__(self, item: str) -> str | int:
+        if item == "comp_id":
+            return self.comp_id
+        return self._columns.params[item][self._index]
+
+
+class ShipColumns:
+    def __init__(self):
+        self.ids = array(ID_TYPECODE)
+        self.components = {component: array(ID_TYPECODE) for component in COMPONENTS}
+
+    def append(self, row: tuple) -> None:
+        ship_id, *component_ids = row
+        self.ids.append(encode_id("Ship", ship_id))
+        for component, component_id in zip(COMPONENTS, component_ids, strict=True):
+            self.components[component].append(
+                encode_id(component.capitalize(), component_id)
+            )
+
+    def get(self, ship_id: str) -> ShipRow | None:
+        index = _find(self.ids, encode_id("Ship", ship_id))
+        return None if index is None else ShipRow(self, index)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class ComponentColumns:
+    def __init__(self, structure: ComponentStructure):
+        self.structure = structure
+        self.prefix = structure.type.capitalize()
+        self.ids = array(ID_TYPECODE)
+        self.params = {param: array(VALUE_TYPECODE) for param in structure.params}
+
+    def append(self, row: tuple) -> None:
+        component_id, *values = row
+        self.ids.append(encode_id(self.prefix, component_id))
+        for param, value in zip(self.structure.params, values, strict=True):
+            self.params[param].append(value)
+
+    def get(self, component_id: str) -> ComponentRow | None:
+        index = _find(self.ids, encode_id(self.prefix, component_id))
+        return None if index is None else ComponentRow(self, index)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class ColumnarSnapshot:
+    """Same lookups as the services' Snapshot, backed by array columns"""
+
+    def __init__(self, db_name: str = DB_NAME):
+        self.db_name = db_name
+        self.ships = ShipColumns()
+        self.components = {
+            structure.type: ComponentColumns(structure)
+            for structure in COMPONENT_STRUCTURES
+        }
+
+    @classmethod
+    def load(
+        cls, db_name: str = DB_NAME, batch_size: int = FETCH_BATCH_SIZE
+    ) -> "ColumnarSnapshot":
+        """Rows are streamed from the database into the columns, at most
+        `batch_size` of them exist as Python tuples at a time
+        """
+        snapshot = cls(db_name)
+
+        for row in ShipRepository.iter_all(db_name, batch_size):
+            snapshot.ships.append(row)
+        _sort_columns(snapshot.ships.ids, list(snapshot.ships.components.values()))
+
+        for columns in snapshot.components.values():
+            for row in ComponentRepository.iter_all(
+                db_name, columns.structure.table_name, batch_size
+            ):
+                columns.append(row)
+            _sort_columns(columns.ids, list(columns.params.values()))
+
+        logger.info(
+            lazy(
+                COLUMNAR_LOADED,
+                db_name=db_name,
+                ships=len(snapshot.ships),
+                components=sum(map(len, snapshot.components.values())),
+            )
+        )
+        return snapshot
+
+    def get_ship(self, ship_id: str) -> ShipRow | None:
+        return self.ships.get(ship_id)
+
+    def get_component(
+        self, component_type: str, component_id: str
+    ) -> ComponentRow | None:
+        return self.components[component_type].get(component_id)
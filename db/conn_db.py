@@ -1,8 +1,11 @@
 import sqlite3
-from collections.abc import Generator
+import threading
+from collections import defaultdict
+from collections.abc import Callable, Generator
 from contextlib import contextmanager
+from pathlib import Path
 
-from config import DB_NAME
+from config import DB_NAME, DB_PROFILE, DB_PROFILES, METRICS_ENABLED, POOL_MAX_SIZE
 from constants import (
     CLOSED_CONNECTION,
     CONNECTING_TO_DB,
@@ -10,44 +13,350 @@ from constants import (
     CURSOR_OPERATION_FAILED,
     DB_ERROR,
     DB_OPERATION_FAILED,
+    POOL_CLOSED,
+    POOL_CONNECTION_DISCARDED,
+    POOL_PRAGMA_FAILED,
+    POOL_PROFILE_APPLIED,
     UNEXPECTED_DB_ERROR,
     UNEXPECTED_ERROR,
+    UNKNOWN_DB_PROFILE,
 )
-from db.logger import logger
+from db.logger import lazy, logger
+from db.metrics import InstrumentedConnection
+from db.statements import statements
 
 
 class DatabaseError(Exception):
     pass
 
 
+def is_memory_db(db_name: str) -> bool:
+    return db_name.startswith("file:") and "mode=memory" in db_name
+
+
+def read_only_uri(db_name: str, immutable: bool = False) -> str:
+    """URI opening a database file read-only. An immutable database is read
+    without locks and change detection, so it must not be written meanwhile.
+    In-memory databases can't be opened read-only and keep their name.
+    """
+    if is_memory_db(db_name):
+        return db_name
+    uri = f"{Path(db_name).resolve().as_uri()}?mode=ro"
+    return f"{uri}&immutable=1" if immutable else uri
+
+
+def connect(
+    db_name: str, read_only: bool = False, immutable: bool = False
+) -> sqlite3.Connection:
+    logger.debug(lazy(CONNECTING_TO_DB, db_name=db_name))
+    name = read_only_uri(db_name, immutable) if read_only else db_name
+    conn = sqlite3.connect(
+        name,
+        check_same_thread=False,
+        uri=name.startswith("file:"),
+        factory=InstrumentedConnection if METRICS_ENABLED else sqlite3.Connection,
+        cached_statements=statements.cache_size,
+    )
+    if read_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def apply_profile(
+    conn: sqlite3.Connection, db_name: str, profile: str, read_only: bool = False
+) -> None:
+    """Run the PRAGMAs of a DB_PROFILES entry on a connection outside of a
+    transaction. A PRAGMA SQLite refuses, e.g. leaving WAL while other
+    connections are open, is logged and skipped. The journal mode belongs to
+    the database file and is left to read-write connections.
+    """
+    for pragma, value in DB_PROFILES[profile].items():
+        if read_only and pragma == "journal_mode":
+            continue
+        try:
+            conn.execute(f"PRAGMA {pragma} = {value}").fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(
+                lazy(
+                    POOL_PRAGMA_FAILED, pragma=pragma, value=value, db_name=db_name, e=e
+                )
+            )
+    logger.debug(lazy(POOL_PROFILE_APPLIED, profile=profile, db_name=db_name))
+
+
+class ConnectionPool:
+    """Long-lived connections keyed by database path.
+
+    Connections are checked out exclusively, so they may be shared between
+    threads. Only idle connections are bounded: at most `max_size` are kept
+    per database and access mode, extra ones are closed on release. Checked
+    out connections are not capped. In-memory databases additionally get
+    an anchor connection that keeps them alive until `close()`.
+
+    Checked out connections are switched to the PRAGMA `profile` of the
+    pool, or of the calling thread's `use_profile()` block, unless they
+    already use it.
+
+    Read-only connections are pooled separately and open database files
+    with mode=ro, so they see every committed write. Inside
+    `immutable_reads()` they are opened immutable instead, the WAL is
+    checkpointed on entry and before new readers following writes.
+    Entering and leaving the block, and writes inside it, bump the write
+    generation of the database: idle readers are closed, checked out ones
+    are older than the current generation and closed on release instead of
+    pooled.
+    """
+
+    def __init__(self, max_size: int = POOL_MAX_SIZE, profile: str = DB_PROFILE):
+        if profile not in DB_PROFILES:
+            raise ValueError(UNKNOWN_DB_PROFILE.format(profile=profile))
+
+        self.max_size = max_size
+        self.profile = profile
+        # profile of the calling thread's use_profile() block
+        self._local = threading.local()
+        self._idle: dict[tuple[str, bool], list[sqlite3.Connection]] = defaultdict(list)
+        self._anchors: dict[str, sqlite3.Connection] = {}
+        self._profiles: dict[sqlite3.Connection, str] = {}
+        self._generations: dict[str, int] = defaultdict(int)
+        self._reader_generations: dict[sqlite3.Connection, int] = {}
+        # active immutable_reads() blocks per database
+        self._immutable: dict[str, int] = defaultdict(int)
+        # whether a database has row digests, see db.digest.has_digests
+        self._digests: dict[str, bool] = {}
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+
+    @staticmethod
+    def _is_healthy(conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return not conn.in_transaction
+
+    def acquire(self, db_name: str, read_only: bool = False) -> sqlite3.Connection:
+        while True:
+            with self._lock:
+                idle = self._idle[(db_name, read_only)]
+                conn = idle.pop() if idle else None
+
+            if conn is None:
+                self._anchor(db_name)
+                # taken before the checkpoint, a write after it makes the
+                # new reader stale
+                with self._lock:
+                    generation = self._generations[db_name]
+                    immutable = read_only and self._immutable[db_name] > 0
+                if immutable:
+                    self._checkpoint(db_name)
+                conn = connect(db_name, read_only, immutable)
+                if read_only:
+                    with self._lock:
+                        self._reader_generations[conn] = generation
+            elif not self._is_healthy(conn):
+                logger.debug(lazy(POOL_CONNECTION_DISCARDED, db_name=db_name))
+                self._forget(conn)
+                conn.close()
+                continue
+
+            profile = getattr(self._local, "profile", None) or self.profile
+            if self._profiles.get(conn) != profile:
+                apply_profile(conn, db_name, profile, read_only)
+                self._profiles[conn] = profile
+            return conn
+
+    def _checkpoint(self, db_name: str) -> None:
+        """Move WAL content into the database file, immutable readers ignore it.
+        Databases without a WAL, e.g. not in WAL mode, need no checkpoint.
+        """
+        if is_memory_db(db_name):
+            return
+
+        wal = Path(f"{db_name}-wal")
+        # a concurrent checkpoint would be busy, the first one empties the WAL
+        with self._checkpoint_lock:
+            if not wal.exists() or not wal.stat().st_size:
+                return
+
+            conn = self.acquire(db_name)
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            finally:
+                self.release(db_name, conn)
+
+    def _forget(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            self._profiles.pop(conn, None)
+            self._reader_generations.pop(conn, None)
+
+    def _anchor(self, db_name: str) -> None:
+        if not is_memory_db(db_name):
+            return
+
+        with self._lock:
+            if db_name not in self._anchors:
+                self._anchors[db_name] = connect(db_name)
+
+    def release(
+        self, db_name: str, conn: sqlite3.Connection, read_only: bool = False
+    ) -> None:
+        with self._lock:
+            stale = (
+                read_only
+                and self._reader_generations.get(conn) != self._generations[db_name]
+            )
+            idle = self._idle[(db_name, read_only)]
+            if not stale and len(idle) < self.max_size:
+                idle.append(conn)
+                return
+
+        self._forget(conn)
+        conn.close()
+        logger.debug(lazy(CLOSED_CONNECTION, db_name=db_name))
+
+    def _close_connections(
+        self, db_name: str, connections: list[sqlite3.Connection]
+    ) -> None:
+        for conn in connections:
+            self._forget(conn)
+            conn.close()
+
+        if connections:
+            logger.debug(lazy(POOL_CLOSED, count=len(connections), db_name=db_name))
+
+    def _new_generation(self, db_name: str) -> None:
+        """Close idle read-only connections now, checked out ones on release"""
+        with self._lock:
+            self._generations[db_name] += 1
+            connections = self._idle.pop((db_name, True), [])
+        self._close_connections(db_name, connections)
+
+    def invalidate_readers(self, db_name: str) -> None:
+        """Called after writes: immutable readers may have cached stale pages.
+        mode=ro readers notice writes themselves and are kept.
+        """
+        with self._lock:
+            if not self._immutable[db_name]:
+                return
+        self._new_generation(db_name)
+
+    @contextmanager
+    def immutable_reads(self, *db_names: str) -> Generator[None, None, None]:
+        """Open read-only connections to the databases immutable inside the
+        block: without locks and change detection, for phases that don't
+        write them, e.g. comparing databases. Blocks may nest and overlap
+        between threads. The WAL is checkpointed on entry, so processes
+        spawned inside the block find it empty and don't race to checkpoint.
+        """
+        for db_name in db_names:
+            with self._lock:
+                self._immutable[db_name] += 1
+                first = self._immutable[db_name] == 1
+            if first:
+                self._new_generation(db_name)
+                self._checkpoint(db_name)
+        try:
+            yield
+        finally:
+            for db_name in db_names:
+                with self._lock:
+                    self._immutable[db_name] -= 1
+                    last = not self._immutable[db_name]
+                if last:
+                    self._new_generation(db_name)
+
+    def has_digests(self, db_name: str, lookup: Callable[[], bool]) -> bool:
+        """Cached result of `lookup` for the database until `forget_digests`"""
+        with self._lock:
+            cached = self._digests.get(db_name)
+        if cached is None:
+            cached = lookup()
+            with self._lock:
+                self._digests[db_name] = cached
+        return cached
+
+    def forget_digests(self, db_name: str) -> None:
+        """Called when digests are built or the database is dropped"""
+        with self._lock:
+            self._digests.pop(db_name, None)
+
+    def close(self, db_name: str) -> None:
+        """Close idle connections to one database, e.g. before removing it.
+        An in-memory database is discarded once its anchor is closed.
+        """
+        with self._lock:
+            connections = self._idle.pop((db_name, False), [])
+            connections += self._idle.pop((db_name, True), [])
+            anchor = self._anchors.pop(db_name, None)
+
+        if anchor is not None:
+            connections.append(anchor)
+
+        self._close_connections(db_name, connections)
+
+    def close_all(self) -> None:
+        with self._lock:
+            db_names = {db_name for db_name, _ in self._idle} | set(self._anchors)
+
+        for db_name in db_names:
+            self.close(db_name)
+
+    @contextmanager
+    def use_profile(self, profile: str) -> Generator[None, None, None]:
+        """Switch connections the calling thread checks out inside the block
+        to another profile. Other threads, e.g. executor workers, keep theirs.
+        """
+        if profile not in DB_PROFILES:
+            raise ValueError(UNKNOWN_DB_PROFILE.format(profile=profile))
+
+        previous = getattr(self._local, "profile", None)
+        self._local.profile = profile
+        try:
+            yield
+        finally:
+            self._local.profile = previous
+
+
+pool = ConnectionPool()
+
+
 @contextmanager
-def conn_db(db_name: str = DB_NAME) -> Generator[sqlite3.Connection, None, None]:
-    logger.debug(CONNECTING_TO_DB.format(db_name=db_name))
-    conn = sqlite3.connect(db_name)
+def conn_db(
+    db_name: str = DB_NAME, read_only: bool = False
+) -> Generator[sqlite3.Connection, None, None]:
+    """Pooled connection committed on success and rolled back on errors.
+    A read-only connection is never committed.
+    """
+    conn = pool.acquire(db_name, read_only)
     try:
         yield conn
-        conn.commit()
+        if not read_only:
+            conn.commit()
     except sqlite3.Error as e:
         conn.rollback()
-        logger.error(DB_ERROR.format(db_name=db_name, e=e))
+        logger.error(lazy(DB_ERROR, db_name=db_name, e=e))
         raise DatabaseError(DB_OPERATION_FAILED.format(e=e)) from e
     except Exception as e:
         conn.rollback()
-        logger.error(UNEXPECTED_ERROR.format(db_name=db_name, e=e))
+        logger.error(lazy(UNEXPECTED_ERROR, db_name=db_name, e=e))
         raise DatabaseError(UNEXPECTED_DB_ERROR.format(e=e)) from e
     finally:
-        conn.close()
-        logger.debug(CLOSED_CONNECTION.format(db_name=db_name))
+        pool.release(db_name, conn, read_only)
+        if not read_only:
+            pool.invalidate_readers(db_name)
 
 
 @contextmanager
-def get_cursor(db_name: str = DB_NAME) -> Generator[sqlite3.Cursor, None, None]:
-    with conn_db(db_name) as conn:
+def get_cursor(
+    db_name: str = DB_NAME, read_only: bool = False
+) -> Generator[sqlite3.Cursor, None, None]:
+    with conn_db(db_name, read_only) as conn:
         cursor = conn.cursor()
         try:
             yield cursor
         except sqlite3.Error as e:
-            logger.error(CURSOR_ERROR.format(db_name=db_name, e=e))
+            logger.error(lazy(CURSOR_ERROR, db_name=db_name, e=e))
             raise DatabaseError(CURSOR_OPERATION_FAILED.format(e=e)) from e
         finally:
             cursor.close()
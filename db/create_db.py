@@ -1,8 +1,9 @@
 from enum import Enum
 
-from constants import TABLE_CREATED
+from config import DB_NAME
+from constants import CDC_INSTALLED, SCHEMA_MIGRATED, TABLE_CREATED
 from db.conn_db import get_cursor
-from db.logger import logger
+from db.logger import lazy, logger
 from db.utils import drop_db_if_exists
 
 
@@ -48,10 +49,118 @@ class Tables(Enum):
         """
 
 
-def create_db() -> None:
-    drop_db_if_exists()
+class Indexes(Enum):
+    """Reverse lookups from a component to the ships using it"""
 
-    with get_cursor() as cursor:
+    ships_weapon = "CREATE INDEX IF NOT EXISTS ships_weapon ON ships (weapon);"
+    ships_hull = "CREATE INDEX IF NOT EXISTS ships_hull ON ships (hull);"
+    ships_engine = "CREATE INDEX IF NOT EXISTS ships_engine ON ships (engine);"
+
+
+# Stored in PRAGMA user_version. Databases created before versioning have 0.
+SCHEMA_VERSION = 1
+
+# schema version -> statements upgrading a database from the previous version
+MIGRATIONS = {
+    1: [index.value for index in Indexes],
+}
+
+
+def table_ddl(table: Tables, without_rowid: bool = False) -> str:
+    """CREATE TABLE statement, optionally clustered by primary key"""
+    ddl = table.value.strip()
+    if without_rowid:
+        ddl = ddl.removesuffix(";") + " WITHOUT ROWID;"
+    return ddl
+
+
+def get_schema_version(db_name: str = DB_NAME) -> int:
+    with get_cursor(db_name) as cursor:
+        (version,) = cursor.execute("PRAGMA user_version").fetchone()
+    return version
+
+
+def migrate_db(db_name: str = DB_NAME) -> None:
+    """Bring an existing database up to SCHEMA_VERSION"""
+    version = get_schema_version(db_name)
+    with get_cursor(db_name) as cursor:
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            for statement in MIGRATIONS[target]:
+                cursor.execute(statement)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            logger.info(lazy(SCHEMA_MIGRATED, db_name=db_name, version=target))
+
+
+CHANGELOG_TABLE = """
+            CREATE TABLE IF NOT EXISTS changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_key TEXT NOT NULL,
+                operation TEXT NOT NULL
+            );
+        """
+
+# table -> primary key column, for change tracking and digests
+TABLE_KEYS = {
+    "ships": "ship",
+    "weapons": "weapon",
+    "hulls": "hull",
+    "engines": "engine",
+}
+
+
+def _cdc_triggers(table: str, key: str) -> list[str]:
+    log = "INSERT INTO changelog (table_name, row_key, operation) VALUES"
+    return [
+        f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_cdc_insert AFTER INSERT ON {table}
+            BEGIN
+                {log} ('{table}', NEW.{key}, 'INSERT');
+            END;
+        """,
+        f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_cdc_update AFTER UPDATE ON {table}
+            BEGIN
+                {log} ('{table}', OLD.{key}, 'UPDATE');
+                INSERT INTO changelog (table_name, row_key, operation)
+                SELECT '{table}', NEW.{key}, 'UPDATE' WHERE NEW.{key} IS NOT OLD.{key};
+            END;
+        """,
+        f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_cdc_delete AFTER DELETE ON {table}
+            BEGIN
+                {log} ('{table}', OLD.{key}, 'DELETE');
+            END;
+        """,
+    ]
+
+
+def install_cdc(db_name: str = DB_NAME) -> None:
+    """Log every insert, update and delete of ships and components to the
+    changelog table, see ChangelogRepository
+    """
+    with get_cursor(db_name) as cursor:
+        cursor.execute(CHANGELOG_TABLE)
+        for table, key in TABLE_KEYS.items():
+            for trigger in _cdc_triggers(table, key):
+                cursor.execute(trigger)
+
+    logger.info(lazy(CDC_INSTALLED, db_name=db_name))
+
+
+def create_db(
+    db_name: str = DB_NAME, cdc: bool = False, without_rowid: bool = False
+) -> None:
+    """Tables at schema version 0. migrate_db adds the indexes once the data
+    is loaded, building them after a bulk insert is cheaper than keeping
+    them current during it.
+    """
+    drop_db_if_exists(db_name)
+
+    with get_cursor(db_name) as cursor:
         for table in Tables:
-            cursor.execute(table.value)
-            logger.info(TABLE_CREATED.format(table=table))
+            cursor.execute(table_ddl(table, without_rowid))
+            logger.info(lazy(TABLE_CREATED, table=table))
+
+    if cdc:
+        install_cdc(db_name)
@@ -0,0 +1,233 @@
+"""Row hashes and per-table Merkle trees for fast equality checks.
+
+Every row of ships and the component tables gets a 63-bit hash stored in
+row_digests, next to the data. Rows are spread over DIGEST_BUCKETS buckets
+by key; a bucket digest is the XOR of its row hashes, so a write only
+updates one row hash and one bucket. The buckets are the leaves of a
+Merkle tree, and two databases are compared by walking both trees and
+only reading row hashes of buckets whose digests differ.
+"""
+
+import hashlib
+import sqlite3
+from collections.abc import Iterable
+
+from config import DB_NAME, DIGEST_BUCKETS, TEMP_DB_NAME
+from constants import DIGESTS_BUILT, DIGESTS_COMPARED
+from db.conn_db import get_cursor, pool
+from db.create_db import TABLE_KEYS
+from db.logger import lazy, logger
+from db.statements import statements
+
+DIGEST_TABLES = [
+    """
+        CREATE TABLE IF NOT EXISTS row_digests (
+            table_name TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            digest INTEGER NOT NULL,
+            PRIMARY KEY (table_name, row_key)
+        );
+    """,
+    """
+        CREATE INDEX IF NOT EXISTS row_digests_bucket
+        ON row_digests (table_name, bucket);
+    """,
+    """
+        CREATE TABLE IF NOT EXISTS bucket_digests (
+            table_name TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            digest INTEGER NOT NULL,
+            PRIMARY KEY (table_name, bucket)
+        );
+    """,
+]
+
+HASH_MASK = (1 << 63) - 1  # fits SQLite's signed 64-bit INTEGER
+
+
+def _hash(data: bytes) -> int:
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, "big") & HASH_MASK
+
+
+def _hash_pair(left: int, right: int | None) -> int:
+    return _hash(f"{left}:{right}".encode())
+
+
+def row_hash(row: tuple) -> int:
+    return _hash(repr(row).encode())
+
+
+def key_bucket(row_key: str, buckets: int = DIGEST_BUCKETS) -> int:
+    return _hash(row_key.encode()) % buckets
+
+
+def has_digests(db_name: str, cursor: sqlite3.Cursor) -> bool:
+    """Looked up once per database, the pool keeps the answer until
+    build_digests or drop_db_if_exists
+    """
+
+    def lookup() -> bool:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master "
+            "WHERE type = 'table' AND name = 'bucket_digests'"
+        )
+        return cursor.fetchone() is not None
+
+    return pool.has_digests(db_name, lookup)
+
+
+def build_digests(db_name: str = DB_NAME) -> None:
+    """(Re)compute the row and bucket digests of every table"""
+    with get_cursor(db_name) as cursor:
+        for ddl in DIGEST_TABLES:
+            cursor.execute(ddl)
+        cursor.execute("DELETE FROM row_digests")
+        cursor.execute("DELETE FROM bucket_digests")
+
+        for table in TABLE_KEYS:
+            buckets = [0] * DIGEST_BUCKETS
+            rows = []
+            for row in cursor.connection.execute(statements.table(table).find_all):
+                bucket, digest = key_bucket(row[0]), row_hash(row)
+                buckets[bucket] ^= digest
+                rows.append((table, row[0], bucket, digest))
+            cursor.executemany("INSERT INTO row_digests VALUES (?, ?, ?, ?)", rows)
+            cursor.executemany(
+                "INSERT INTO bucket_digests VALUES (?, ?, ?)",
+                [(table, bucket, digest) for bucket, digest in enumerate(buckets)],
+            )
+    pool.forget_digests(db_name)
+
+    logger.info(lazy(DIGESTS_BUILT, db_name=db_name))
+
+
+def update_row_digests(
+    db_name: str, cursor: sqlite3.Cursor, table: str, row_keys: Iterable[str]
+) -> None:
+    """Refresh digests of rows just written in the cursor's transaction.
+    Databases with digests always keep them current, diff_digests trusts
+    them; does nothing for databases without digests.
+    """
+    if not has_digests(db_name, cursor):
+        return
+
+    find_row = statements.table(table).find_by_id
+    for row_key in set(row_keys):
+        old = cursor.execute(
+            "SELECT bucket, digest FROM row_digests "
+            "WHERE table_name = ? AND row_key = ?",
+            (table, row_key),
+        ).fetchone()
+        row = cursor.execute(find_row, (row_key,)).fetchone()
+
+        bucket = old[0] if old else key_bucket(row_key)
+        digest = row_hash(row) if row else 0
+        change = (old[1] if old else 0) ^ digest
+        if not change:
+            continue
+
+        if row:
+            cursor.execute(
+                "INSERT OR REPLACE INTO row_digests VALUES (?, ?, ?, ?)",
+                (table, row_key, bucket, digest),
+            )
+        else:
+            cursor.execute(
+                "DELETE FROM row_digests WHERE table_name = ? AND row_key = ?",
+                (table, row_key),
+            )
+        (bucket_digest,) = cursor.execute(
+            "SELECT digest FROM bucket_digests WHERE table_name = ? AND bucket = ?",
+            (table, bucket),
+        ).fetchone()
+        cursor.execute(
+            "UPDATE bucket_digests SET digest = ? WHERE table_name = ? AND bucket = ?",
+            (bucket_digest ^ change, table, bucket),
+        )
+
+
+class MerkleTree:
+    """Binary hash tree over bucket digests; levels[0] are the leaves"""
+
+    def __init__(self, leaves: list[int]):
+        self.levels = [leaves]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append(
+                [
+                    _hash_pair(level[i], level[i + 1] if i + 1 < len(level) else None)
+                    for i in range(0, len(level), 2)
+                ]
+            )
+
+    @property
+    def root(self) -> int:
+        return self.levels[-1][0]
+
+    @classmethod
+    def load(cls, db_name: str, table: str) -> "MerkleTree":
+        with get_cursor(db_name, read_only=True) as cursor:
+            rows = cursor.execute(
+                "SELECT digest FROM bucket_digests WHERE table_name = ? "
+                "ORDER BY bucket",
+                (table,),
+            ).fetchall()
+        return cls([digest for (digest,) in rows])
+
+    def diff_buckets(self, other: "MerkleTree") -> list[int]:
+        """Leaves that differ, descending only into differing subtrees"""
+        nodes = [0]
+        for depth in range(len(self.levels) - 1, -1, -1):
+            level, other_level = self.levels[depth], other.levels[depth]
+            nodes = [node for node in nodes if level[node] != other_level[node]]
+            if depth:
+                nodes = [
+                    child
+                    for node in nodes
+                    for child in (2 * node, 2 * node + 1)
+                    if child < len(self.levels[depth - 1])
+                ]
+        return nodes
+
+
+def _bucket_rows(db_name: str, table: str, buckets: list[int]) -> dict[str, int]:
+    with get_cursor(db_name, read_only=True) as cursor:
+        rows = cursor.execute(
+            f"SELECT row_key, digest FROM row_digests WHERE table_name = ? "
+            f"AND bucket IN ({', '.join('?' * len(buckets))})",
+            (table, *buckets),
+        ).fetchall()
+    return dict(rows)
+
+
+def diff_digests(
+    db_name: str = DB_NAME, other_db_name: str = TEMP_DB_NAME
+) -> dict[str, set[str]]:
+    """Keys of rows that differ between two databases with digests, by table"""
+    changed = {}
+    for table in TABLE_KEYS:
+        buckets = MerkleTree.load(db_name, table).diff_buckets(
+            MerkleTree.load(other_db_name, table)
+        )
+        if not buckets:
+            continue
+
+        rows = _bucket_rows(db_name, table, buckets)
+        other_rows = _bucket_rows(other_db_name, table, buckets)
+        changed[table] = {
+            row_key
+            for row_key in rows.keys() | other_rows.keys()
+            if rows.get(row_key) != other_rows.get(row_key)
+        }
+
+    logger.info(
+        lazy(
+            DIGESTS_COMPARED,
+            db_name=db_name,
+            other_db_name=other_db_name,
+            count=sum(map(len, changed.values())),
+        )
+    )
+    return changed
@@ -1,9 +1,39 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 
 from config import LOG_FILE
 
+_listener: QueueListener | None = None
+
+
+class LazyMessage:
+    """str.format template that is only formatted if the record is emitted"""
+
+    __slots__ = ("template", "kwargs")
+
+    def __init__(self, template: str, kwargs: dict):
+        self.template = template
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        return self.template.format(**self.kwargs)
+
+
+def lazy(template: str, **kwargs) -> LazyMessage:
+    return LazyMessage(template, kwargs)
+
+
+def stop_listener() -> None:
+    """Flush queued records and stop the background writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def setup_logger(
     name: str = "WG",
@@ -11,6 +41,12 @@ def setup_logger(
     log_file: str | None = None,
     console_output: bool = False,
 ) -> logging.Logger:
+    """Records are put on a queue by the calling thread and written to the
+    console/file handlers by a QueueListener thread.
+    """
+    global _listener
+    stop_listener()
+
     logger = logging.getLogger(name)
     logger.setLevel(level)
 
@@ -20,12 +56,13 @@ def setup_logger(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
+    handlers: list[logging.Handler] = []
 
     if console_output:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(level)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
     if log_file:
         log_path = Path(log_file)
@@ -34,9 +71,16 @@ def setup_logger(
         file_handler = logging.FileHandler(log_file)
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if handlers:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        logger.addHandler(QueueHandler(log_queue))
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
 
     return logger
 
 
 logger = setup_logger(log_file=str(LOG_FILE))
+atexit.register(stop_listener)
@@ -0,0 +1,230 @@
+"""Query metrics of the connections opened by db.conn_db (WOW_DB_METRICS=1).
+
+Instrumented connections time every statement, keyed by its normalized SQL,
+and count connects, commits, rollbacks and fetched rows in `registry`,
+which can be dumped as JSON or in the Prometheus text format.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# upper bounds in seconds, the last bucket takes everything else
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+LIFETIME_BUCKETS = (0.01, 0.1, 1.0, 10.0, 60.0, 600.0)
+
+# counters reported from the start, even while zero
+COUNTERS = ("connects", "closes", "commits", "rollbacks", "statements", "rows_fetched")
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Statement text with literals replaced by ? and whitespace collapsed"""
+    return _WHITESPACE.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    total: float = 0.0
+
+    def __post_init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        index = next(
+            (i for i, bound in enumerate(self.buckets) if value <= bound),
+            len(self.buckets),
+        )
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(le, count) pairs as in Prometheus histograms"""
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        running, pairs = 0, []
+        for bound, count in zip(bounds, self.counts, strict=True):
+            running += count
+            pairs.append((bound, running))
+        return pairs
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "buckets": dict(self.cumulative()),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.counters: Counter[str] = Counter(dict.fromkeys(COUNTERS, 0))
+        self.statements: dict[str, Histogram] = {}
+        self.connection_lifetime = Histogram(LIFETIME_BUCKETS)
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def observe_statement(self, sql: str, elapsed: float) -> None:
+        key = normalize_sql(sql)
+        with self._lock:
+            histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+
+    def observe_connection(self, lifetime: float) -> None:
+        with self._lock:
+            self.connection_lifetime.observe(lifetime)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters = Counter(dict.fromkeys(COUNTERS, 0))
+            self.statements.clear()
+            self.connection_lifetime = Histogram(LIFETIME_BUCKETS)
+
+    def to_dict(self) -> dict:
+        """Statements are ordered by total time, hottest first"""
+        with self._lock:
+            statements = sorted(
+                self.statements.items(), key=lambda item: item[1].total, reverse=True
+            )
+            return {
+                "counters": dict(self.counters),
+                "connection_lifetime_seconds": self.connection_lifetime.to_dict(),
+                "statements": {sql: hist.to_dict() for sql, hist in statements},
+            }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        data = self.to_dict()
+        lines = []
+        for name, value in sorted(data["counters"].items()):
+            lines.append(f"# TYPE wow_db_{name}_total counter")
+            lines.append(f"wow_db_{name}_total {value}")
+
+        lines.append("# TYPE wow_db_connection_lifetime_seconds histogram")
+        lines += _prometheus_histogram(
+            "wow_db_connection_lifetime_seconds",
+            "",
+            data["connection_lifetime_seconds"],
+        )
+
+        lines.append("# TYPE wow_db_statement_seconds histogram")
+        for sql, histogram in data["statements"].items():
+            label = sql.replace("\\", "\\\\").replace('"', '\\"')
+            lines += _prometheus_histogram(
+                "wow_db_statement_seconds", f'sql="{label}",', histogram
+            )
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Path) -> None:
+        """Write path.json and path.prom"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.with_suffix(".json").write_text(self.to_json())
+        path.with_suffix(".prom").write_text(self.to_prometheus())
+
+
+def _prometheus_histogram(name: str, labels: str, histogram: dict) -> list[str]:
+    lines = [
+        f'{name}_bucket{{{labels}le="{bound}"}} {count}'
+        for bound, count in histogram["buckets"].items()
+    ]
+    plain_labels = f"{{{labels.rstrip(',')}}}" if labels else ""
+    lines.append(f"{name}_sum{plain_labels} {histogram['sum']}")
+    lines.append(f"{name}_count{plain_labels} {histogram['count']}")
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql: str, parameters=()) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            registry.observe_statement(sql, time.perf_counter() - start)
+            registry.increment("statements")
+
+    def executemany(self, sql: str, seq_of_parameters) -> "InstrumentedCursor":
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            registry.observe_statement(sql, time.perf_counter() - start)
+            registry.increment("statements")
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            registry.increment("rows_fetched")
+        return row
+
+    def fetchmany(self, size: int | None = None) -> list:
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        registry.increment("rows_fetched", len(rows))
+        return rows
+
+    def fetchall(self) -> list:
+        rows = super().fetchall()
+        registry.increment("rows_fetched", len(rows))
+        return rows
+
+    def __next__(self):
+        row = super().__next__()
+        registry.increment("rows_fetched")
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors report to `registry`, passed to
+    sqlite3.connect as factory
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.opened_at = time.monotonic()
+        self.closed = False
+        registry.increment("connects")
+
+    def cursor(self, factory=None) -> sqlite3.Cursor:
+        return super().cursor(factory or InstrumentedCursor)
+
+    # Connection.execute* don't go through cursor(), route them explicitly
+    def execute(self, sql: str, parameters=()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql: str, seq_of_parameters) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self) -> None:
+        super().commit()
+        registry.increment("commits")
+
+    def rollback(self) -> None:
+        super().rollback()
+        registry.increment("rollbacks")
+
+    def close(self) -> None:
+        super().close()
+        if self.closed:
+            return
+        self.closed = True
+        registry.observe_connection(time.monotonic() - self.opened_at)
+        registry.increment("closes")
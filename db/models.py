@@ -1,9 +1,10 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+from typing import Any, Protocol
 
 from config import ENGINES_COUNT, HULLS_COUNT, WEAPONS_COUNT
 
 
-@dataclass
+@dataclass(slots=True)
 class Ship:
     ship_id: str
     weapon: str
@@ -21,6 +22,9 @@ class Component:
     def __getitem__(self, item):
         return getattr(self, item)
 
+    def keys(self) -> list[str]:
+        return [field.name for field in fields(self)]
+
 
 @dataclass(slots=True)
 class Weapon(Component):
@@ -44,6 +48,26 @@ class Engine(Component):
     type: int
 
 
+class ShipView(Protocol):
+    """Item access shared by Ship and the columnar ShipRow"""
+
+    @property
+    def ship_id(self) -> str: ...
+
+    def __getitem__(self, item: str) -> Any: ...
+
+
+class ComponentView(Protocol):
+    """Item access shared by Component and the columnar ComponentRow"""
+
+    @property
+    def comp_id(self) -> str: ...
+
+    def keys(self) -> list[str]: ...
+
+    def __getitem__(self, item: str) -> Any: ...
+
+
 @dataclass(frozen=True)
 class ComponentStructure:
     """Useful information about components"""
@@ -64,3 +88,32 @@ weapon = ComponentStructure(
 hull = ComponentStructure("hull", ["armor", "type", "capacity"], "hulls", HULLS_COUNT)
 
 engine = ComponentStructure("engine", ["power", "type"], "engines", ENGINES_COUNT)
+
+COMPONENT_STRUCTURES = [weapon, hull, engine]
+
+
+@dataclass(frozen=True, slots=True)
+class ComponentChange:
+    ship_id: str
+    component_type: str
+    orig_comp: str
+    changed_comp: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class ParamChange:
+    ship_id: str
+    comp_id: str
+    param: str
+    orig_value: int
+    changed_value: int | None
+
+
+@dataclass
+class DatabaseDiff:
+    """Precomputed differences keyed by (ship_id, component_type)"""
+
+    component_changes: dict[tuple[str, str], ComponentChange] = field(
+        default_factory=dict
+    )
+    param_changes: dict[tuple[str, str], ParamChange] = field(default_factory=dict)
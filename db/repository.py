@@ -1,57 +1,127 @@
+import json
+import sqlite3
+from collections import defaultdict
+from collections.abc import Generator, Iterator
+from contextlib import contextmanager
+
+from config import FETCH_BATCH_SIZE
 from constants import (
+    REPO_CHANGELOG_FIND,
+    REPO_CHANGELOG_FOUND,
     REPO_COMPONENT_FIND_ALL,
     REPO_COMPONENT_FIND_ALL_SUCCESS,
     REPO_COMPONENT_FIND_NOT_FOUND,
     REPO_COMPONENT_FIND_START,
     REPO_COMPONENT_FIND_SUCCESS,
     REPO_COMPONENT_UPDATE,
+    REPO_COMPONENT_UPDATE_BULK,
+    REPO_COMPONENT_UPDATE_BULK_SUCCESS,
     REPO_COMPONENT_UPDATE_SUCCESS,
+    REPO_DIFF_COMPONENTS,
+    REPO_DIFF_FOUND,
+    REPO_DIFF_SHIPS,
     REPO_SHIP_FIND_ALL,
     REPO_SHIP_FIND_ALL_SUCCESS,
+    REPO_SHIP_FIND_BY_COMPONENT,
+    REPO_SHIP_FIND_BY_COMPONENT_SUCCESS,
     REPO_SHIP_FIND_NOT_FOUND,
     REPO_SHIP_FIND_START,
     REPO_SHIP_FIND_SUCCESS,
     REPO_SHIP_UPDATE,
+    REPO_SHIP_UPDATE_BULK,
+    REPO_SHIP_UPDATE_BULK_SUCCESS,
     REPO_SHIP_UPDATE_SUCCESS,
 )
-from db.conn_db import get_cursor
-from db.logger import logger
+from db.conn_db import get_cursor, read_only_uri
+from db.digest import update_row_digests
+from db.logger import lazy, logger
+from db.models import ComponentStructure
+from db.statements import statements
+
+
+def _fetch_batches(
+    cursor: sqlite3.Cursor, batch_size: int
+) -> Generator[tuple, None, int]:
+    """Yield the rows of an executed query batch by batch, return their count"""
+    count = 0
+    while rows := cursor.fetchmany(batch_size):
+        yield from rows
+        count += len(rows)
+    return count
 
 
 class ShipRepository:
     @staticmethod
     def find_by_id(db_name: str, ship_id: str) -> tuple | None:
-        logger.debug(REPO_SHIP_FIND_START.format(ship_id=ship_id, db_name=db_name))
-        with get_cursor(db_name) as cursor:
-            cursor.execute("SELECT * FROM ships WHERE ship=?", (ship_id,))
+        logger.debug(lazy(REPO_SHIP_FIND_START, ship_id=ship_id, db_name=db_name))
+        with get_cursor(db_name, read_only=True) as cursor:
+            cursor.execute(statements.ships.find_by_id, (ship_id,))
             ship = cursor.fetchone()
 
         if ship:
-            logger.debug(REPO_SHIP_FIND_SUCCESS.format(ship_id=ship_id))
+            logger.debug(lazy(REPO_SHIP_FIND_SUCCESS, ship_id=ship_id))
         else:
             logger.debug(
-                REPO_SHIP_FIND_NOT_FOUND.format(ship_id=ship_id, db_name=db_name)
+                lazy(REPO_SHIP_FIND_NOT_FOUND, ship_id=ship_id, db_name=db_name)
             )
 
         return ship
 
+    @staticmethod
+    def find_by_component(
+        db_name: str, component: str, component_id: str
+    ) -> list[tuple]:
+        """Ships using a component, served by the ships_<component> index"""
+        logger.debug(
+            lazy(
+                REPO_SHIP_FIND_BY_COMPONENT,
+                component=component,
+                component_id=component_id,
+                db_name=db_name,
+            )
+        )
+        with get_cursor(db_name, read_only=True) as cursor:
+            ships = cursor.execute(
+                statements.ships.by_component(component), (component_id,)
+            ).fetchall()
+
+        logger.debug(
+            lazy(
+                REPO_SHIP_FIND_BY_COMPONENT_SUCCESS,
+                count=len(ships),
+                component_id=component_id,
+            )
+        )
+        return ships
+
     @staticmethod
     def find_all(db_name: str) -> list[tuple]:
-        logger.debug(REPO_SHIP_FIND_ALL.format(db_name=db_name))
-        with get_cursor(db_name) as cursor:
-            ships = cursor.execute("SELECT * FROM ships").fetchall()
+        logger.debug(lazy(REPO_SHIP_FIND_ALL, db_name=db_name))
+        with get_cursor(db_name, read_only=True) as cursor:
+            ships = cursor.execute(statements.ships.find_all).fetchall()
 
         logger.debug(
-            REPO_SHIP_FIND_ALL_SUCCESS.format(count=len(ships), db_name=db_name)
+            lazy(REPO_SHIP_FIND_ALL_SUCCESS, count=len(ships), db_name=db_name)
         )
         return ships
 
+    @staticmethod
+    def iter_all(db_name: str, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[tuple]:
+        """Rows of find_all, fetched `batch_size` at a time"""
+        logger.debug(lazy(REPO_SHIP_FIND_ALL, db_name=db_name))
+        with get_cursor(db_name, read_only=True) as cursor:
+            cursor.execute(statements.ships.find_all)
+            count = yield from _fetch_batches(cursor, batch_size)
+
+        logger.debug(lazy(REPO_SHIP_FIND_ALL_SUCCESS, count=count, db_name=db_name))
+
     @staticmethod
     def update_component(
         db_name: str, ship_id: str, component: str, component_id: str
     ) -> None:
         logger.debug(
-            REPO_SHIP_UPDATE.format(
+            lazy(
+                REPO_SHIP_UPDATE,
                 ship_id=ship_id,
                 component=component,
                 component_id=component_id,
@@ -59,12 +129,30 @@ class ShipRepository:
             )
         )
         with get_cursor(db_name) as cursor:
-            cursor.execute(
-                f"UPDATE ships SET {component} = ? WHERE ship = ?",
-                (component_id, ship_id),
+            cursor.execute(statements.ships.update(component), (component_id, ship_id))
+            update_row_digests(db_name, cursor, "ships", [ship_id])
+
+        logger.debug(lazy(REPO_SHIP_UPDATE_SUCCESS, ship_id=ship_id))
+
+    @staticmethod
+    def update_components_bulk(
+        db_name: str, updates: list[tuple[str, str, str]]
+    ) -> None:
+        """Apply (ship_id, component, component_id) updates in one transaction"""
+        logger.debug(lazy(REPO_SHIP_UPDATE_BULK, count=len(updates), db_name=db_name))
+
+        by_component = defaultdict(list)
+        for ship_id, component, component_id in updates:
+            by_component[component].append((component_id, ship_id))
+
+        with get_cursor(db_name) as cursor:
+            for component, params in by_component.items():
+                cursor.executemany(statements.ships.update(component), params)
+            update_row_digests(
+                db_name, cursor, "ships", (ship_id for ship_id, *_ in updates)
             )
 
-        logger.debug(REPO_SHIP_UPDATE_SUCCESS.format(ship_id=ship_id))
+        logger.debug(lazy(REPO_SHIP_UPDATE_BULK_SUCCESS, count=len(updates)))
 
 
 class ComponentRepository:
@@ -73,25 +161,28 @@ class ComponentRepository:
         db_name: str, component_table: str, component_type: str, component_id: str
     ) -> tuple | None:
         logger.debug(
-            REPO_COMPONENT_FIND_START.format(
+            lazy(
+                REPO_COMPONENT_FIND_START,
                 component_type=component_type,
                 component_id=component_id,
                 db_name=db_name,
             )
         )
-        with get_cursor(db_name) as cursor:
+        with get_cursor(db_name, read_only=True) as cursor:
             cursor.execute(
-                f"SELECT * FROM {component_table} WHERE {component_type}=?",
+                statements.component(component_table, component_type).find_by_id,
                 (component_id,),
             )
             component = cursor.fetchone()
 
         if component:
-            logger.debug(REPO_COMPONENT_FIND_SUCCESS.format(component_id=component_id))
+            logger.debug(lazy(REPO_COMPONENT_FIND_SUCCESS, component_id=component_id))
         else:
             logger.debug(
-                REPO_COMPONENT_FIND_NOT_FOUND.format(
-                    component_id=component_id, db_name=db_name
+                lazy(
+                    REPO_COMPONENT_FIND_NOT_FOUND,
+                    component_id=component_id,
+                    db_name=db_name,
                 )
             )
 
@@ -100,20 +191,50 @@ class ComponentRepository:
     @staticmethod
     def find_all(db_name: str, component_table: str) -> list[tuple]:
         logger.debug(
-            REPO_COMPONENT_FIND_ALL.format(
-                component_table=component_table, db_name=db_name
+            lazy(
+                REPO_COMPONENT_FIND_ALL,
+                component_table=component_table,
+                db_name=db_name,
             )
         )
-        with get_cursor(db_name) as cursor:
-            components = cursor.execute(f"SELECT * FROM {component_table}").fetchall()
+        with get_cursor(db_name, read_only=True) as cursor:
+            components = cursor.execute(
+                statements.component(component_table).find_all
+            ).fetchall()
 
         logger.debug(
-            REPO_COMPONENT_FIND_ALL_SUCCESS.format(
-                count=len(components), component_table=component_table
+            lazy(
+                REPO_COMPONENT_FIND_ALL_SUCCESS,
+                count=len(components),
+                component_table=component_table,
             )
         )
         return components
 
+    @staticmethod
+    def iter_all(
+        db_name: str, component_table: str, batch_size: int = FETCH_BATCH_SIZE
+    ) -> Iterator[tuple]:
+        """Rows of find_all, fetched `batch_size` at a time"""
+        logger.debug(
+            lazy(
+                REPO_COMPONENT_FIND_ALL,
+                component_table=component_table,
+                db_name=db_name,
+            )
+        )
+        with get_cursor(db_name, read_only=True) as cursor:
+            cursor.execute(statements.component(component_table).find_all)
+            count = yield from _fetch_batches(cursor, batch_size)
+
+        logger.debug(
+            lazy(
+                REPO_COMPONENT_FIND_ALL_SUCCESS,
+                count=count,
+                component_table=component_table,
+            )
+        )
+
     @staticmethod
     def update_parameter(
         db_name: str,
@@ -124,7 +245,8 @@ class ComponentRepository:
         param_value: int,
     ) -> None:
         logger.debug(
-            REPO_COMPONENT_UPDATE.format(
+            lazy(
+                REPO_COMPONENT_UPDATE,
                 component_id=component_id,
                 param_name=param_name,
                 param_value=param_value,
@@ -132,10 +254,177 @@ class ComponentRepository:
         )
         with get_cursor(db_name) as cursor:
             cursor.execute(
-                f"UPDATE {component_table} "
-                f"SET {param_name} = ? "
-                f"WHERE {component_type} = ?",
+                statements.component(component_table, component_type).update(
+                    param_name
+                ),
                 (param_value, component_id),
             )
+            update_row_digests(db_name, cursor, component_table, [component_id])
+
+        logger.debug(lazy(REPO_COMPONENT_UPDATE_SUCCESS, component_id=component_id))
+
+    @staticmethod
+    def update_parameters_bulk(
+        db_name: str,
+        component_table: str,
+        component_type: str,
+        updates: list[tuple[str, str, int]],
+    ) -> None:
+        """Apply (component_id, param_name, param_value) updates in one transaction"""
+        logger.debug(
+            lazy(
+                REPO_COMPONENT_UPDATE_BULK,
+                count=len(updates),
+                component_table=component_table,
+                db_name=db_name,
+            )
+        )
+
+        by_param = defaultdict(list)
+        for component_id, param_name, param_value in updates:
+            by_param[param_name].append((param_value, component_id))
+
+        with get_cursor(db_name) as cursor:
+            component_statements = statements.component(component_table, component_type)
+            for param_name, params in by_param.items():
+                cursor.executemany(component_statements.update(param_name), params)
+            update_row_digests(
+                db_name,
+                cursor,
+                component_table,
+                (component_id for component_id, *_ in updates),
+            )
+
+        logger.debug(
+            lazy(
+                REPO_COMPONENT_UPDATE_BULK_SUCCESS,
+                count=len(updates),
+                component_table=component_table,
+            )
+        )
+
+
+class DiffRepository:
+    """Set-based comparison of two databases with the same schema"""
+
+    @staticmethod
+    @contextmanager
+    def _attached(db_name: str, other_db_name: str) -> Generator:
+        with get_cursor(db_name, read_only=True) as cursor:
+            cursor.execute(statements.diff.attach, (read_only_uri(other_db_name),))
+            try:
+                yield cursor
+            finally:
+                cursor.execute(statements.diff.detach)
+
+    @staticmethod
+    def _filter_params(
+        table: str,
+        since_seq: int | None,
+        changed_keys: dict[str, set[str]] | None,
+    ) -> tuple:
+        """Parameters of the diff statement variant selected by since_seq and
+        changed_keys, restricting it to rows in the changed database's
+        changelog after since_seq and/or to the keys of the table in
+        changed_keys
+        """
+        params: tuple = ()
+        if since_seq is not None:
+            params += (since_seq,)
+        if changed_keys is not None:
+            params += (json.dumps(sorted(changed_keys.get(table, ()))),)
+        return params
+
+    @staticmethod
+    def find_ship_changes(
+        db_name: str,
+        other_db_name: str,
+        components: list[str],
+        since_seq: int | None = None,
+        changed_keys: dict[str, set[str]] | None = None,
+    ) -> list[tuple]:
+        """Rows of (ship_id, component, orig_component_id, changed_component_id).
+        With since_seq only ships in the changelog after it are compared,
+        with changed_keys (see db.digest.diff_digests) only the ships in it.
+        """
+        logger.debug(
+            lazy(REPO_DIFF_SHIPS, db_name=db_name, other_db_name=other_db_name)
+        )
+        queries = [
+            statements.diff.ships(
+                component, since_seq is not None, changed_keys is not None
+            )
+            for component in components
+        ]
+        params = DiffRepository._filter_params("ships", since_seq, changed_keys)
+        rows = []
+        with DiffRepository._attached(db_name, other_db_name) as cursor:
+            for query in queries:
+                rows += cursor.execute(query, params).fetchall()
+
+        logger.debug(lazy(REPO_DIFF_FOUND, count=len(rows)))
+        return rows
 
-        logger.debug(REPO_COMPONENT_UPDATE_SUCCESS.format(component_id=component_id))
+    @staticmethod
+    def find_component_changes(
+        db_name: str,
+        other_db_name: str,
+        comp_structure: ComponentStructure,
+        since_seq: int | None = None,
+        changed_keys: dict[str, set[str]] | None = None,
+    ) -> list[tuple]:
+        """Rows of (ship_id, *original component row, *changed component row)
+        for every ship whose original component has any changed parameter.
+        With since_seq only components in the changelog after it are
+        compared, with changed_keys only the components in it.
+        """
+        table = comp_structure.table_name
+        logger.debug(
+            lazy(
+                REPO_DIFF_COMPONENTS,
+                component_table=table,
+                db_name=db_name,
+                other_db_name=other_db_name,
+            )
+        )
+        query = statements.diff.components(
+            table, since_seq is not None, changed_keys is not None
+        )
+        params = DiffRepository._filter_params(table, since_seq, changed_keys)
+        with DiffRepository._attached(db_name, other_db_name) as cursor:
+            rows = cursor.execute(query, params).fetchall()
+
+        logger.debug(lazy(REPO_DIFF_FOUND, count=len(rows)))
+        return rows
+
+
+class ChangelogRepository:
+    """Reader of the changelog written by db.create_db.install_cdc"""
+
+    @staticmethod
+    def find_since(db_name: str, since_seq: int = 0) -> list[tuple]:
+        """Rows of (seq, table_name, row_key, operation) after since_seq"""
+        logger.debug(lazy(REPO_CHANGELOG_FIND, db_name=db_name, since_seq=since_seq))
+        with get_cursor(db_name, read_only=True) as cursor:
+            rows = cursor.execute(
+                "SELECT seq, table_name, row_key, operation FROM changelog "
+                "WHERE seq > ? ORDER BY seq",
+                (since_seq,),
+            ).fetchall()
+
+        logger.debug(lazy(REPO_CHANGELOG_FOUND, count=len(rows)))
+        return rows
+
+    @staticmethod
+    def find_changed_keys(db_name: str, since_seq: int = 0) -> dict[str, set[str]]:
+        """Keys of changed rows by table"""
+        changed_keys = defaultdict(set)
+        for _, table, row_key, _ in ChangelogRepository.find_since(db_name, since_seq):
+            changed_keys[table].add(row_key)
+        return dict(changed_keys)
+
+    @staticmethod
+    def last_seq(db_name: str) -> int:
+        with get_cursor(db_name, read_only=True) as cursor:
+            (seq,) = cursor.execute("SELECT MAX(seq) FROM changelog").fetchone()
+        return seq or 0
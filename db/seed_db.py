@@ -1,50 +1,81 @@
-import random
+from collections.abc import Iterator
+from itertools import islice
 
-from config import ENGINES_COUNT, HULLS_COUNT, SHIPS_COUNT, WEAPONS_COUNT
-from constants import DB_POPULATED_SUCCESSFULLY, DB_SEEDING_START
-from db.conn_db import get_cursor
-from db.logger import logger
-from db.utils import get_rand_param_value
+from config import (
+    DB_NAME,
+    ENGINES_COUNT,
+    HULLS_COUNT,
+    SEED_CHUNK_SIZE,
+    SHIPS_COUNT,
+    WEAPONS_COUNT,
+)
+from constants import DB_POPULATED_SUCCESSFULLY, DB_SEEDING_CHUNK, DB_SEEDING_START
+from db.conn_db import get_cursor, pool
+from db.logger import lazy, logger
+from db.utils import DataGenerator
 
 NUM_WEAPON_PARAMS = 5
 NUM_HULL_PARAMS = 3
 NUM_ENGINE_PARAMS = 2
 
 
-weapons_data = [
-    (f"Weapon-{i + 1}", *[get_rand_param_value() for _ in range(NUM_WEAPON_PARAMS)])
-    for i in range(WEAPONS_COUNT)
-]
-
-hulls_data = [
-    (f"Hull-{i + 1}", *[get_rand_param_value() for _ in range(NUM_HULL_PARAMS)])
-    for i in range(HULLS_COUNT)
-]
-
-engines_data = [
-    (f"Engine-{i + 1}", *[get_rand_param_value() for _ in range(NUM_ENGINE_PARAMS)])
-    for i in range(ENGINES_COUNT)
-]
-
-ships_data = [
-    (
-        f"Ship-{i + 1}",
-        f"Weapon-{random.randint(1, WEAPONS_COUNT)}",
-        f"Hull-{random.randint(1, HULLS_COUNT)}",
-        f"Engine-{random.randint(1, ENGINES_COUNT)}",
-    )
-    for i in range(SHIPS_COUNT)
-]
-
-
-def seed_db():
-    logger.info(DB_SEEDING_START)
-    with get_cursor() as cursor:
-        cursor.executemany(
-            "INSERT INTO weapons VALUES (?, ?, ?, ?, ?, ?)", weapons_data
+def generate_components(
+    generator: DataGenerator, name: str, count: int, num_params: int
+) -> Iterator[tuple]:
+    for i in range(count):
+        yield (f"{name}-{i + 1}", *[generator.param_value() for _ in range(num_params)])
+
+
+def generate_ships(
+    generator: DataGenerator, count: int = SHIPS_COUNT
+) -> Iterator[tuple]:
+    for i in range(count):
+        yield (
+            f"Ship-{i + 1}",
+            generator.component_id("weapon", WEAPONS_COUNT),
+            generator.component_id("hull", HULLS_COUNT),
+            generator.component_id("engine", ENGINES_COUNT),
+        )
+
+
+def insert_chunked(
+    cursor, table: str, rows: Iterator[tuple], chunk_size: int = SEED_CHUNK_SIZE
+) -> None:
+    """executemany over `rows` in chunks, so only one chunk is held in memory"""
+    inserted = 0
+    while chunk := list(islice(rows, chunk_size)):
+        placeholders = ", ".join("?" * len(chunk[0]))
+        cursor.executemany(f"INSERT INTO {table} VALUES ({placeholders})", chunk)
+        inserted += len(chunk)
+        logger.debug(lazy(DB_SEEDING_CHUNK, table=table, count=inserted))
+
+
+def seed_db(
+    db_name: str = DB_NAME,
+    generator: DataGenerator | None = None,
+    chunk_size: int = SEED_CHUNK_SIZE,
+) -> None:
+    generator = generator or DataGenerator(stream="seed")
+    logger.info(lazy(DB_SEEDING_START, seed=generator.seed))
+    with pool.use_profile("bulk-load"), get_cursor(db_name) as cursor:
+        insert_chunked(
+            cursor,
+            "weapons",
+            generate_components(generator, "Weapon", WEAPONS_COUNT, NUM_WEAPON_PARAMS),
+            chunk_size,
+        )
+        insert_chunked(
+            cursor,
+            "hulls",
+            generate_components(generator, "Hull", HULLS_COUNT, NUM_HULL_PARAMS),
+            chunk_size,
+        )
+        insert_chunked(
+            cursor,
+            "engines",
+            generate_components(generator, "Engine", ENGINES_COUNT, NUM_ENGINE_PARAMS),
+            chunk_size,
         )
-        cursor.executemany("INSERT INTO hulls VALUES (?, ?, ?, ?)", hulls_data)
-        cursor.executemany("INSERT INTO engines VALUES (?, ?, ?)", engines_data)
-        cursor.executemany("INSERT INTO ships VALUES (?, ?, ?, ?)", ships_data)
+        insert_chunked(cursor, "ships", generate_ships(generator), chunk_size)
 
     logger.info(DB_POPULATED_SUCCESSFULLY)
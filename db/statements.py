@@ -0,0 +1,217 @@
+"""SQL of the repositories, built once from the component structures.
+
+Table and column names can't be bound as parameters, so every statement
+that needs one is generated here at import from COMPONENT_STRUCTURES,
+after checking the names are plain identifiers. Repositories look the
+statements up by component and parameter: unknown names raise ValueError
+instead of reaching SQL, and the same string object is returned on every
+call, so sqlite3's per-connection statement cache always hits. The diff
+statements come in one variant per filter of the compared rows.
+"""
+
+import re
+from dataclasses import dataclass
+
+from constants import (
+    INVALID_IDENTIFIER_MESSAGE,
+    UNKNOWN_COMPONENT_MESSAGE,
+    UNKNOWN_PARAM_MESSAGE,
+)
+from db.models import COMPONENT_STRUCTURES, ComponentStructure
+
+_IDENTIFIER = re.compile(r"[a-z_][a-z0-9_]*")
+
+# room in the statement cache for the digest, changelog and PRAGMA
+# statements, sqlite3's default cached_statements
+STATEMENT_CACHE_HEADROOM = 128
+
+# schema name of the compared database attached by DiffRepository
+ATTACHED_DB_ALIAS = "changed"
+
+# (since_seq, changed_keys) filters of the diff statements
+DIFF_FILTERS = [(False, False), (True, False), (False, True), (True, True)]
+
+
+def _identifier(name: str) -> str:
+    if not _IDENTIFIER.fullmatch(name):
+        raise ValueError(INVALID_IDENTIFIER_MESSAGE.format(name=name))
+    return name
+
+
+@dataclass(frozen=True)
+class ComponentStatements:
+    structure: ComponentStructure
+    find_by_id: str
+    find_all: str
+    update_parameter: dict[str, str]
+
+    @classmethod
+    def build(cls, structure: ComponentStructure) -> "ComponentStatements":
+        table = _identifier(structure.table_name)
+        key = _identifier(structure.type)
+        return cls(
+            structure,
+            f"SELECT * FROM {table} WHERE {key} = ?",
+            f"SELECT * FROM {table}",
+            {
+                param: f"UPDATE {table} SET {_identifier(param)} = ? WHERE {key} = ?"
+                for param in structure.params
+            },
+        )
+
+    def update(self, param_name: str) -> str:
+        sql = self.update_parameter.get(param_name)
+        if sql is None:
+            raise ValueError(
+                UNKNOWN_PARAM_MESSAGE.format(
+                    param=param_name, table=self.structure.table_name
+                )
+            )
+        return sql
+
+
+@dataclass(frozen=True)
+class ShipStatements:
+    find_by_id: str
+    find_all: str
+    find_by_component: dict[str, str]
+    update_component: dict[str, str]
+
+    @classmethod
+    def build(cls, structures: list[ComponentStructure]) -> "ShipStatements":
+        components = [_identifier(structure.type) for structure in structures]
+        return cls(
+            "SELECT * FROM ships WHERE ship = ?",
+            "SELECT * FROM ships",
+            {comp: f"SELECT * FROM ships WHERE {comp} = ?" for comp in components},
+            {
+                comp: f"UPDATE ships SET {comp} = ? WHERE ship = ?"
+                for comp in components
+            },
+        )
+
+    @staticmethod
+    def _get(statements: dict[str, str], component: str) -> str:
+        sql = statements.get(component)
+        if sql is None:
+            raise ValueError(UNKNOWN_COMPONENT_MESSAGE.format(comp=component))
+        return sql
+
+    def by_component(self, component: str) -> str:
+        return self._get(self.find_by_component, component)
+
+    def update(self, component: str) -> str:
+        return self._get(self.update_component, component)
+
+
+def _diff_filter(table: str, key_column: str, since_seq: bool, keys: bool) -> str:
+    """Conditions restricting a diff to rows in the attached database's
+    changelog after a bound sequence number and/or to a bound JSON array of
+    keys
+    """
+    conditions = ""
+    if since_seq:
+        conditions += (
+            f" AND {key_column} IN (SELECT row_key FROM {ATTACHED_DB_ALIAS}.changelog "
+            f"WHERE table_name = '{table}' AND seq > ?)"
+        )
+    if keys:
+        # one JSON parameter instead of a placeholder per key
+        conditions += f" AND {key_column} IN (SELECT value FROM json_each(?))"
+    return conditions
+
+
+@dataclass(frozen=True)
+class DiffStatements:
+    attach: str
+    detach: str
+    # keyed by (component, since_seq, changed_keys)
+    ship_changes: dict[tuple[str, bool, bool], str]
+    # keyed by (component table, since_seq, changed_keys)
+    component_changes: dict[tuple[str, bool, bool], str]
+
+    @classmethod
+    def build(cls, structures: list[ComponentStructure]) -> "DiffStatements":
+        alias = _identifier(ATTACHED_DB_ALIAS)
+        ship_changes, component_changes = {}, {}
+        for structure in structures:
+            comp = _identifier(structure.type)
+            table = _identifier(structure.table_name)
+            changed_params = " OR ".join(
+                f"o.{_identifier(param)} IS NOT c.{param}" for param in structure.params
+            )
+            for since_seq, keys in DIFF_FILTERS:
+                ship_changes[(comp, since_seq, keys)] = (
+                    f"SELECT o.ship, '{comp}', o.{comp}, c.{comp} "
+                    f"FROM main.ships AS o "
+                    f"LEFT JOIN {alias}.ships AS c ON c.ship = o.ship "
+                    f"WHERE o.{comp} IS NOT c.{comp}"
+                    + _diff_filter("ships", "o.ship", since_seq, keys)
+                )
+                component_changes[(table, since_seq, keys)] = (
+                    f"SELECT s.ship, o.*, c.* "
+                    f"FROM main.ships AS s "
+                    f"JOIN main.{table} AS o ON o.{comp} = s.{comp} "
+                    f"LEFT JOIN {alias}.{table} AS c ON c.{comp} = o.{comp} "
+                    f"WHERE ({changed_params})"
+                    + _diff_filter(table, f"o.{comp}", since_seq, keys)
+                )
+        return cls(
+            f"ATTACH DATABASE ? AS {alias}",
+            f"DETACH DATABASE {alias}",
+            ship_changes,
+            component_changes,
+        )
+
+    def ships(self, component: str, since_seq: bool, keys: bool) -> str:
+        sql = self.ship_changes.get((component, since_seq, keys))
+        if sql is None:
+            raise ValueError(UNKNOWN_COMPONENT_MESSAGE.format(comp=component))
+        return sql
+
+    def components(self, component_table: str, since_seq: bool, keys: bool) -> str:
+        sql = self.component_changes.get((component_table, since_seq, keys))
+        if sql is None:
+            raise ValueError(UNKNOWN_COMPONENT_MESSAGE.format(comp=component_table))
+        return sql
+
+
+class StatementRegistry:
+    def __init__(self, structures: list[ComponentStructure] = COMPONENT_STRUCTURES):
+        self.ships = ShipStatements.build(structures)
+        self.components = {
+            structure.table_name: ComponentStatements.build(structure)
+            for structure in structures
+        }
+        self.diff = DiffStatements.build(structures)
+
+    def component(
+        self, component_table: str, component_type: str | None = None
+    ) -> ComponentStatements:
+        """Statements of a component table, optionally checking its key column"""
+        statements = self.components.get(component_table)
+        if statements is None:
+            raise ValueError(UNKNOWN_COMPONENT_MESSAGE.format(comp=component_table))
+        if component_type not in (None, statements.structure.type):
+            raise ValueError(UNKNOWN_COMPONENT_MESSAGE.format(comp=component_type))
+        return statements
+
+    def table(self, table: str) -> ShipStatements | ComponentStatements:
+        """find_by_id and find_all of ships or a component table"""
+        return self.ships if table == "ships" else self.component(table)
+
+    def __len__(self) -> int:
+        ships = self.ships
+        count = 2 + len(ships.find_by_component) + len(ships.update_component)
+        for statements in self.components.values():
+            count += 2 + len(statements.update_parameter)
+        diff = self.diff
+        return count + 2 + len(diff.ship_changes) + len(diff.component_changes)
+
+    @property
+    def cache_size(self) -> int:
+        """cached_statements that fits every registered statement"""
+        return len(self) + STATEMENT_CACHE_HEADROOM
+
+
+statements = StatementRegistry()
@@ -1,17 +1,69 @@
-import shutil
+import sqlite3
+import time
+from collections.abc import Callable
 
-from config import DB_NAME, TEMP_DB_NAME
-from constants import TMP_DB_CREATED, TMP_DB_REMOVED
-from db.logger import logger
+from config import BACKUP_PAGES_PER_STEP, DB_NAME, TEMP_DB_NAME
+from constants import (
+    DB_BACKUP_COMPLETED,
+    DB_BACKUP_PROGRESS,
+    TMP_DB_CREATED,
+    TMP_DB_REMOVED,
+)
+from db.conn_db import conn_db
+from db.logger import lazy, logger
 from db.utils import drop_db_if_exists
 
+# (status, remaining pages, total pages), as passed by sqlite3.Connection.backup
+BackupProgress = Callable[[int, int, int], None]
 
-def create_tmp_db() -> None:
-    drop_db_if_exists(TEMP_DB_NAME)
-    shutil.copy(DB_NAME, TEMP_DB_NAME)
-    logger.info(TMP_DB_CREATED.format(db_name=TEMP_DB_NAME))
 
+def log_backup_progress(status: int, remaining: int, total: int) -> None:
+    logger.debug(lazy(DB_BACKUP_PROGRESS, copied=total - remaining, total=total))
 
-def drop_tmp_db() -> None:
-    drop_db_if_exists(TEMP_DB_NAME)
-    logger.info(TMP_DB_REMOVED.format(db_name=TEMP_DB_NAME))
+
+def backup_db(
+    db_name: str,
+    target: sqlite3.Connection,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    progress: BackupProgress | None = log_backup_progress,
+) -> None:
+    """Copy a database into `target` with the SQLite online backup API.
+    Copying `pages` pages per step lets writers proceed between steps.
+    The source is opened read-only, so a missing one fails instead of being
+    created empty.
+    """
+    start = time.perf_counter()
+    with conn_db(db_name, read_only=True) as source:
+        source.backup(target, pages=pages, progress=progress)
+
+    logger.info(
+        lazy(DB_BACKUP_COMPLETED, db_name=db_name, elapsed=time.perf_counter() - start)
+    )
+
+
+def create_tmp_db(
+    db_name: str = DB_NAME,
+    tmp_db_name: str = TEMP_DB_NAME,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    progress: BackupProgress | None = log_backup_progress,
+) -> None:
+    drop_db_if_exists(tmp_db_name)
+    with conn_db(tmp_db_name) as target:
+        backup_db(db_name, target, pages, progress)
+    logger.info(lazy(TMP_DB_CREATED, db_name=tmp_db_name))
+
+
+def snapshot_to_memory(
+    db_name: str = DB_NAME,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    progress: BackupProgress | None = log_backup_progress,
+) -> sqlite3.Connection:
+    """Private in-memory copy of a database, closed by the caller"""
+    target = sqlite3.connect(":memory:", check_same_thread=False)
+    backup_db(db_name, target, pages, progress)
+    return target
+
+
+def drop_tmp_db(tmp_db_name: str = TEMP_DB_NAME) -> None:
+    drop_db_if_exists(tmp_db_name)
+    logger.info(lazy(TMP_DB_REMOVED, db_name=tmp_db_name))
@@ -1,14 +1,47 @@
 import os
 import random
+from collections.abc import Sequence
 
-from config import DB_NAME, MAX_PARAM_VALUE, MIN_PARAM_VALUE
+from config import DB_NAME, MAX_PARAM_VALUE, MIN_PARAM_VALUE, RANDOM_SEED
+from db.conn_db import is_memory_db, pool
 
 
-def get_rand_param_value() -> int:
-    """все параметры заполняются случайным числом от 1 до 20 (так сказано в задании)"""
-    return random.randint(MIN_PARAM_VALUE, MAX_PARAM_VALUE)
+def new_seed() -> int:
+    return random.SystemRandom().randrange(2**32)
+
+
+class DataGenerator:
+    """Seedable source of random data. Generators with the same seed and
+    stream name produce the same sequence, independently of other streams.
+    """
+
+    def __init__(self, seed: int | None = RANDOM_SEED, stream: str = ""):
+        self.seed = new_seed() if seed is None else seed
+        self.stream = stream
+        self._random = random.Random(f"{self.seed}:{stream}")
+
+    def param_value(self) -> int:
+        """все параметры заполняются случайным числом от 1 до 20
+        (так сказано в задании)
+        """
+        return self._random.randint(MIN_PARAM_VALUE, MAX_PARAM_VALUE)
+
+    def component_id(self, component_type: str, component_count: int) -> str:
+        return (
+            f"{component_type.capitalize()}-{self._random.randint(1, component_count)}"
+        )
+
+    def choice(self, items: Sequence[str]) -> str:
+        return self._random.choice(items)
 
 
 def drop_db_if_exists(db_name: str = DB_NAME) -> None:
-    if os.path.exists(db_name):
-        os.remove(db_name)
+    pool.close(db_name)
+    pool.forget_digests(db_name)
+    if is_memory_db(db_name):
+        return
+
+    # WAL and journal files left behind by a connection that wasn't closed
+    for path in (db_name, f"{db_name}-wal", f"{db_name}-shm", f"{db_name}-journal"):
+        if os.path.exists(path):
+            os.remove(path)
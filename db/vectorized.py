@@ -0,0 +1,192 @@
+"""Vectorized comparison of two databases with NumPy (pip install numpy).
+
+Both databases are loaded as columnar snapshots, whose array columns are
+viewed as NumPy arrays without copying. Rows are aligned by ID and every
+parameter is compared in one operation per table.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from config import COMPONENTS, DB_NAME, TEMP_DB_NAME
+from constants import VECTORIZED_COMPARE_COMPLETE
+from db.columnar import ColumnarSnapshot, decode_id
+from db.logger import lazy, logger
+from db.models import ComponentChange, ComponentStructure, DatabaseDiff, ParamChange
+
+
+def _as_numpy(column) -> np.ndarray:
+    return np.frombuffer(column, dtype=np.intc)
+
+
+def _align(ids: np.ndarray, other_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Positions of `ids` in sorted `other_ids` and which of them exist there"""
+    if len(other_ids) == 0:
+        return np.zeros(len(ids), dtype=np.intp), np.zeros(len(ids), dtype=bool)
+
+    positions = np.searchsorted(other_ids, ids).clip(max=len(other_ids) - 1)
+    return positions, other_ids[positions] == ids
+
+
+@dataclass
+class ComponentMask:
+    """Original components and their counterparts in the changed database.
+    Row i of every array belongs to ids[i]; columns follow structure.params.
+    """
+
+    structure: ComponentStructure
+    ids: np.ndarray
+    original: np.ndarray
+    changed: np.ndarray
+    present: np.ndarray
+    mask: np.ndarray
+
+    def param_mask(self, param: str) -> np.ndarray:
+        return self.mask[:, self.structure.params.index(param)]
+
+    @property
+    def changed_rows(self) -> np.ndarray:
+        return np.asarray(self.mask.any(axis=1))
+
+
+@dataclass
+class ShipMask:
+    """Component IDs of every original ship in both databases, by component"""
+
+    ids: np.ndarray
+    original: dict[str, np.ndarray]
+    changed: dict[str, np.ndarray]
+    present: np.ndarray
+    mask: dict[str, np.ndarray]
+
+
+def compare_components(
+    original: ColumnarSnapshot, changed: ColumnarSnapshot, component_type: str
+) -> ComponentMask:
+    orig_columns = original.components[component_type]
+    changed_columns = changed.components[component_type]
+    params = orig_columns.structure.params
+
+    ids = _as_numpy(orig_columns.ids)
+    positions, present = _align(ids, _as_numpy(changed_columns.ids))
+
+    orig_values = np.column_stack(
+        [_as_numpy(orig_columns.params[param]) for param in params]
+    )
+    changed_values = np.column_stack(
+        [
+            _as_numpy(changed_columns.params[param])[positions]
+            if len(changed_columns)
+            else np.zeros(len(ids), dtype=np.intc)
+            for param in params
+        ]
+    )
+    mask = (orig_values != changed_values) | ~present[:, np.newaxis]
+
+    return ComponentMask(
+        orig_columns.structure, ids, orig_values, changed_values, present, mask
+    )
+
+
+def compare_ships(original: ColumnarSnapshot, changed: ColumnarSnapshot) -> ShipMask:
+    ids = _as_numpy(original.ships.ids)
+    positions, present = _align(ids, _as_numpy(changed.ships.ids))
+
+    orig_components = {}
+    changed_components = {}
+    mask = {}
+    for component in COMPONENTS:
+        orig_components[component] = _as_numpy(original.ships.components[component])
+        changed_column = _as_numpy(changed.ships.components[component])
+        changed_components[component] = (
+            changed_column[positions]
+            if len(changed_column)
+            else np.zeros(len(ids), dtype=np.intc)
+        )
+        mask[component] = (
+            orig_components[component] != changed_components[component]
+        ) | ~present
+
+    return ShipMask(ids, orig_components, changed_components, present, mask)
+
+
+@dataclass
+class VectorizedDiff:
+    ships: ShipMask
+    components: dict[str, ComponentMask]
+
+    def to_database_diff(self) -> DatabaseDiff:
+        """Same verdicts as DiffService.get_diff, for ComparisonService.check_diff"""
+        diff = DatabaseDiff()
+        ships = self.ships
+
+        for component in COMPONENTS:
+            prefix = component.capitalize()
+
+            for i in np.flatnonzero(ships.mask[component]):
+                ship_id = decode_id("Ship", int(ships.ids[i]))
+                changed = (
+                    decode_id(prefix, int(ships.changed[component][i]))
+                    if ships.present[i]
+                    else None
+                )
+                diff.component_changes[(ship_id, component)] = ComponentChange(
+                    ship_id,
+                    component,
+                    decode_id(prefix, int(ships.original[component][i])),
+                    changed,
+                )
+
+            comp_mask = self.components[component]
+            params = comp_mask.structure.params
+            # row of each ship's original component in the component arrays
+            rows, exists = _align(ships.original[component], comp_mask.ids)
+            changed_ships = np.flatnonzero(
+                exists & comp_mask.changed_rows[rows] if len(comp_mask.ids) else exists
+            )
+            for i in changed_ships:
+                row = rows[i]
+                param_index = int(np.argmax(comp_mask.mask[row]))
+                ship_id = decode_id("Ship", int(ships.ids[i]))
+                changed_value = (
+                    int(comp_mask.changed[row, param_index])
+                    if comp_mask.present[row]
+                    else None
+                )
+                diff.param_changes[(ship_id, component)] = ParamChange(
+                    ship_id,
+                    decode_id(prefix, int(comp_mask.ids[row])),
+                    params[param_index],
+                    int(comp_mask.original[row, param_index]),
+                    changed_value,
+                )
+
+        return diff
+
+
+def compare_databases(
+    db_name: str = DB_NAME, other_db_name: str = TEMP_DB_NAME
+) -> VectorizedDiff:
+    original = ColumnarSnapshot.load(db_name)
+    changed = ColumnarSnapshot.load(other_db_name)
+
+    result = VectorizedDiff(
+        compare_ships(original, changed),
+        {
+            component: compare_components(original, changed, component)
+            for component in COMPONENTS
+        },
+    )
+    logger.info(
+        lazy(
+            VECTORIZED_COMPARE_COMPLETE,
+            db_name=db_name,
+            other_db_name=other_db_name,
+            ships=int(sum(mask.sum() for mask in result.ships.mask.values())),
+            components=int(
+                sum(mask.changed_rows.sum() for mask in result.components.values())
+            ),
+        )
+    )
+    return result
@@ -1,96 +1,104 @@
-import random
-from collections.abc import Generator
+from collections.abc import Callable, Generator
+from pathlib import Path
 
 import pytest
 
 from config import (
-    COMPONENTS,
+    CDC_ENABLED,
+    DB_NAME,
+    DIGESTS_ENABLED,
+    METRICS_ENABLED,
+    METRICS_FILE,
+    RANDOM_SEED,
     TEMP_DB_NAME,
 )
 from constants import (
-    TEST_RANDOMIZE_ALL_COMPONENTS,
-    TEST_RANDOMIZE_ALL_SHIPS,
-    TEST_RANDOMIZE_COMPONENT_COMPLETE,
-    TEST_RANDOMIZE_SHIP_COMPLETE,
+    METRICS_DUMPED,
+    SERVICE_COMPONENT_CACHE_STATS,
+    TEST_RANDOM_SEED,
     TEST_RANDOMIZE_TMP_DB_COMPLETED,
     TEST_RANDOMIZE_TMP_DB_START,
 )
-from db.create_db import create_db
-from db.logger import logger
-from db.models import ComponentStructure, engine, hull, weapon
+from db.async_repository import executors
+from db.cache import create_seeded_db
+from db.conn_db import pool
+from db.create_db import create_db, install_cdc, migrate_db
+from db.digest import build_digests
+from db.logger import lazy, logger
+from db.metrics import registry
+from db.models import DatabaseDiff
 from db.seed_db import seed_db
 from db.tmp_db import create_tmp_db, drop_tmp_db
-from db.utils import get_rand_param_value
-from tests.services import ComponentMapper, component_service, ship_service
+from db.utils import DataGenerator, drop_db_if_exists, new_seed
+from tests.randomize import RandomizeDatabase
+from tests.services import component_service, diff_service, snapshots
 
-COMPONENTS_WITH_STRUCTURE = [weapon, hull, engine]
+pytest_plugins = ["pytester", "tests.profiling"]
 
 
-class RandomizeDatabase:
-    def __init__(self, db: str):
-        self.db = db
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--seed",
+        type=int,
+        default=RANDOM_SEED,
+        help="seed of the generated and randomized data",
+    )
 
-    @staticmethod
-    def _get_random_component_id(component: str) -> str:
-        component_count = ComponentMapper.get_component_count(component)
-        return f"{component.capitalize()}-{random.randint(1, component_count)}"
 
-    def _randomize_ship(self, ship_id: str) -> None:
-        component = random.choice(COMPONENTS)
-        new_component_id = self._get_random_component_id(component)
-        ship_service.update_ship_component(
-            self.db, ship_id, component, new_component_id
-        )
-        logger.debug(
-            TEST_RANDOMIZE_SHIP_COMPLETE.format(
-                ship_id=ship_id, component=component, component_id=new_component_id
-            )
-        )
+def pytest_configure(config: pytest.Config) -> None:
+    # pick the seed once in the controller, xdist workers get it from there
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        config.option.seed = workerinput["seed"]
+        config.option.explicit_seed = workerinput["explicit_seed"]
+    else:
+        # only seeds given by --seed or RANDOM_SEED repeat, see create_seeded_db
+        config.option.explicit_seed = config.option.seed is not None
+        if config.option.seed is None:
+            config.option.seed = new_seed()
 
-    def randomize_ships(self) -> None:
-        ships = ship_service.get_all_ships(self.db)
-        logger.info(TEST_RANDOMIZE_ALL_SHIPS)
 
-        for ship_id, *_ in ships:
-            self._randomize_ship(ship_id)
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node) -> None:
+    node.workerinput["seed"] = node.config.option.seed
+    node.workerinput["explicit_seed"] = node.config.option.explicit_seed
 
-    def _randomize_component(
-        self, component_id: str, comp_structure: ComponentStructure
-    ) -> None:
-        param_to_change = random.choice(comp_structure.params)
-        new_value = get_rand_param_value()
 
-        component_service.update_component_parameter(
-            self.db, comp_structure.type, component_id, param_to_change, new_value
-        )
+def pytest_report_header(config: pytest.Config) -> str:
+    return TEST_RANDOM_SEED.format(seed=config.option.seed)
 
-        logger.debug(
-            TEST_RANDOMIZE_COMPONENT_COMPLETE.format(
-                component_id=component_id, param=param_to_change, value=new_value
-            )
-        )
 
-    def randomize_components(self) -> None:
-        for comp_structure in COMPONENTS_WITH_STRUCTURE:
-            components = component_service.get_all_components(
-                self.db, comp_structure.table_name
-            )
-
-            logger.info(
-                TEST_RANDOMIZE_ALL_COMPONENTS.format(
-                    count=len(components), component_type=comp_structure.type
-                )
-            )
-
-            for component_id, *_ in components:
-                self._randomize_component(component_id, comp_structure)
+@pytest.fixture(scope="session")
+def seed(request: pytest.FixtureRequest) -> int:
+    seed = request.config.option.seed
+    logger.info(lazy(TEST_RANDOM_SEED, seed=seed))
+    return seed
 
 
 @pytest.fixture(scope="session", autouse=True)
-def db() -> None:
+def db(seed: int, request: pytest.FixtureRequest) -> Generator:
     """Set up main database"""
-    create_db()
-    seed_db()
+    create_seeded_db(
+        generator=DataGenerator(seed, stream="seed"),
+        cache=request.config.option.explicit_seed,
+    )
+    if DIGESTS_ENABLED:
+        build_digests()
+    component_service.cache.clear()
+    snapshots.clear()
+    yield
+    logger.info(
+        lazy(
+            SERVICE_COMPONENT_CACHE_STATS,
+            hits=component_service.cache.hits,
+            misses=component_service.cache.misses,
+        )
+    )
+    executors.shutdown()
+    pool.close_all()
+    if METRICS_ENABLED:
+        registry.dump(METRICS_FILE)
+        logger.info(lazy(METRICS_DUMPED, path=METRICS_FILE))
 
 
 @pytest.fixture(scope="session")
@@ -98,17 +106,71 @@ def tmp_db() -> Generator:
     """Create temporary db copy"""
     try:
         create_tmp_db()
+        if CDC_ENABLED:
+            install_cdc(TEMP_DB_NAME)
+        component_service.cache.clear(TEMP_DB_NAME)
         yield
     finally:
         drop_tmp_db()
+        component_service.cache.clear(TEMP_DB_NAME)
+        snapshots.pop(TEMP_DB_NAME, None)
 
 
 @pytest.fixture(scope="session")
-def randomize_tmp_db(tmp_db) -> None:
+def randomize_tmp_db(tmp_db, seed: int) -> None:
     logger.info(TEST_RANDOMIZE_TMP_DB_START)
 
-    randomize_db = RandomizeDatabase(TEMP_DB_NAME)
-    randomize_db.randomize_ships()
-    randomize_db.randomize_components()
+    randomize_db = RandomizeDatabase(
+        TEMP_DB_NAME, DataGenerator(seed, stream="randomize")
+    )
+    with pool.use_profile("bulk-load"):
+        randomize_db.randomize_ships()
+        randomize_db.randomize_components()
 
     logger.info(TEST_RANDOMIZE_TMP_DB_COMPLETED)
+
+
+@pytest.fixture(scope="session")
+def db_diff(randomize_tmp_db) -> DatabaseDiff:
+    """All differences between the original and randomized databases"""
+    with pool.use_profile("read-heavy"), pool.immutable_reads(DB_NAME, TEMP_DB_NAME):
+        return diff_service.get_diff(
+            since_seq=0 if CDC_ENABLED else None, digests=DIGESTS_ENABLED
+        )
+
+
+@pytest.fixture
+def seeded_db(tmp_path: Path) -> Generator[Callable[..., str]]:
+    """Factory of databases in tmp_path, dropped after the test.
+    seeded_db(name, seed) creates one seeded by DataGenerator(seed), left
+    empty for seed=None, and migrated unless migrate=False; other keyword
+    arguments go to create_db. seeded_db(name, copy_of=db_name) copies one.
+    """
+    db_names = []
+
+    def create(
+        name: str = "seeded.db",
+        seed: int | None = 1,
+        copy_of: str | None = None,
+        migrate: bool = True,
+        **options,
+    ) -> str:
+        db_name = str(tmp_path / name)
+        db_names.append(db_name)
+        if copy_of is not None:
+            create_tmp_db(copy_of, db_name, progress=None)
+            return db_name
+
+        create_db(db_name, **options)
+        if seed is not None:
+            seed_db(db_name, DataGenerator(seed, stream="seed"))
+        if migrate:
+            migrate_db(db_name)
+        return db_name
+
+    yield create
+
+    for db_name in db_names:
+        drop_db_if_exists(db_name)
+        component_service.cache.clear(db_name)
+        snapshots.pop(db_name, None)
@@ -0,0 +1,132 @@
+"""pytest plugin behind --profile-db, loaded by tests/conftest.py.
+
+The whole session runs under cProfile. Setup, call and teardown phases and
+the setup of every fixture are timed separately; at the end a summary with
+the slowest service and repository methods is written next to the .prof
+file (PROFILE_FILE.txt / .prof, one pair per xdist worker).
+"""
+
+import cProfile
+import pstats
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, cast
+
+import pytest
+
+from config import PROFILE_FILE
+from constants import PROFILE_WRITTEN
+from db.logger import lazy, logger
+
+# functions whose cumulative time is summarized, by file name suffix
+PROFILED_MODULES = ("tests/services.py", "db/repository.py")
+TOP_METHODS = 20
+
+
+def _profiled_module(file: str) -> str | None:
+    """Entry of PROFILED_MODULES a profiled file belongs to"""
+    path = Path(file).as_posix()
+    return next((module for module in PROFILED_MODULES if path.endswith(module)), None)
+
+
+class DbProfiler:
+    def __init__(self, path: Path = PROFILE_FILE):
+        self.path = path
+        self.profile = cProfile.Profile()
+        self.phases: dict[str, float] = defaultdict(float)
+        self.fixtures: dict[str, float] = defaultdict(float)
+        self.summary: list[str] = []
+
+    def _timed(self, totals: dict[str, float], key: str):
+        start = time.perf_counter()
+        try:
+            return (yield)
+        finally:
+            # failing tests raise out of the call phase, count them too
+            totals[key] += time.perf_counter() - start
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        # dependencies are set up before this hook, so times are exclusive
+        return (yield from self._timed(self.fixtures, fixturedef.argname))
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_setup(self, item):
+        return (yield from self._timed(self.phases, "setup"))
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_call(self, item):
+        return (yield from self._timed(self.phases, "call"))
+
+    @pytest.hookimpl(wrapper=True)
+    def pytest_runtest_teardown(self, item, nextitem):
+        return (yield from self._timed(self.phases, "teardown"))
+
+    def pytest_sessionstart(self, session: pytest.Session) -> None:
+        self.profile.enable()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session: pytest.Session) -> None:
+        self.profile.disable()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.profile.dump_stats(self.path.with_suffix(".prof"))
+
+        self.summary = self._summarize()
+        self.path.with_suffix(".txt").write_text("\n".join(self.summary) + "\n")
+        logger.info(lazy(PROFILE_WRITTEN, path=self.path))
+
+    def _summarize(self) -> list[str]:
+        lines = ["phases:"]
+        lines += [
+            f"  {phase:<30}{spent:>10.3f}s" for phase, spent in self.phases.items()
+        ]
+
+        lines.append("fixture setup:")
+        lines += [
+            f"  {name:<30}{spent:>10.3f}s"
+            for name, spent in sorted(
+                self.fixtures.items(), key=lambda item: item[1], reverse=True
+            )
+        ]
+
+        # pstats.Stats.stats is untyped: (file, line, function) -> (primitive
+        # calls, calls, own time, cumulative time, callers)
+        stats: dict[tuple[str, int, str], tuple] = cast(
+            Any, pstats.Stats(self.profile)
+        ).stats
+        methods = []
+        for (file, line, func), (_, calls, _, cumulative, _) in stats.items():
+            module = _profiled_module(file)
+            if module is not None:
+                methods.append((cumulative, calls, f"{module}:{line}({func})"))
+        lines.append("service and repository methods (cumulative):")
+        lines += [
+            f"  {name:<50}{calls:>8} calls{cumulative:>10.3f}s"
+            for cumulative, calls, name in sorted(methods, reverse=True)[:TOP_METHODS]
+        ]
+        lines.append(f"cProfile data: {self.path.with_suffix('.prof')}")
+        return lines
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        terminalreporter.write_sep("-", "database profile")
+        for line in self.summary:
+            terminalreporter.write_line(line)
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--profile-db",
+        action="store_true",
+        help="profile the session, time phases and fixtures (see tests/profiling.py)",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # xdist workers run the tests, the controller has nothing to profile
+    is_controller = (
+        getattr(config, "workerinput", None) is None
+        and getattr(config.option, "dist", "no") != "no"
+    )
+    if config.option.profile_db and not is_controller:
+        config.pluginmanager.register(DbProfiler(), "db_profiler")
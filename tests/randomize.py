@@ -0,0 +1,78 @@
+from config import COMPONENTS
+from constants import (
+    TEST_RANDOMIZE_ALL_COMPONENTS,
+    TEST_RANDOMIZE_ALL_SHIPS,
+    TEST_RANDOMIZE_COMPONENT_COMPLETE,
+    TEST_RANDOMIZE_SHIP_COMPLETE,
+)
+from db.logger import lazy, logger
+from db.models import COMPONENT_STRUCTURES, ComponentStructure
+from db.utils import DataGenerator
+from tests.services import ComponentMapper, component_service, ship_service
+
+
+class RandomizeDatabase:
+    def __init__(self, db: str, generator: DataGenerator):
+        self.db = db
+        self.generator = generator
+
+    def _get_random_component_id(self, component: str) -> str:
+        component_count = ComponentMapper.get_component_count(component)
+        return self.generator.component_id(component, component_count)
+
+    def _randomize_ship(self, ship_id: str) -> tuple[str, str, str]:
+        component = self.generator.choice(COMPONENTS)
+        new_component_id = self._get_random_component_id(component)
+        logger.debug(
+            lazy(
+                TEST_RANDOMIZE_SHIP_COMPLETE,
+                ship_id=ship_id,
+                component=component,
+                component_id=new_component_id,
+            )
+        )
+        return ship_id, component, new_component_id
+
+    def randomize_ships(self) -> None:
+        ships = ship_service.get_all_ships(self.db)
+        logger.info(TEST_RANDOMIZE_ALL_SHIPS)
+
+        updates = [self._randomize_ship(ship_id) for ship_id, *_ in ships]
+        ship_service.update_ship_components_bulk(self.db, updates)
+
+    def _randomize_component(
+        self, component_id: str, comp_structure: ComponentStructure
+    ) -> tuple[str, str, int]:
+        param_to_change = self.generator.choice(comp_structure.params)
+        new_value = self.generator.param_value()
+        logger.debug(
+            lazy(
+                TEST_RANDOMIZE_COMPONENT_COMPLETE,
+                component_id=component_id,
+                param=param_to_change,
+                value=new_value,
+            )
+        )
+        return component_id, param_to_change, new_value
+
+    def randomize_components(self) -> None:
+        for comp_structure in COMPONENT_STRUCTURES:
+            components = component_service.get_all_components(
+                self.db, comp_structure.table_name
+            )
+
+            logger.info(
+                lazy(
+                    TEST_RANDOMIZE_ALL_COMPONENTS,
+                    count=len(components),
+                    component_type=comp_structure.type,
+                )
+            )
+
+            updates = [
+                self._randomize_component(component_id, comp_structure)
+                for component_id, *_ in components
+            ]
+            component_service.update_component_parameters_bulk(
+                self.db, comp_structure.type, updates
+            )
@@ -1,8 +1,14 @@
-from dataclasses import fields
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
 
 import pytest
 
 from config import (
+    COMPONENT_CACHE_SIZE,
+    COMPONENT_CACHE_TTL,
     DB_NAME,
     ENGINES_COUNT,
     HULLS_COUNT,
@@ -18,20 +24,41 @@ from constants import (
     SERVICE_COMPARE_SHIPS_DIFFER,
     SERVICE_COMPARE_SHIPS_MATCH,
     SERVICE_COMPARE_SHIPS_START,
+    SERVICE_COMPONENT_CACHE_HIT,
+    SERVICE_DIFF_COMPLETE,
+    SERVICE_DIFF_START,
     SERVICE_GET_COMPONENT_ERROR,
     SERVICE_GET_COMPONENT_START,
     SERVICE_GET_COMPONENT_SUCCESS,
     SERVICE_GET_SHIP_ERROR,
     SERVICE_GET_SHIP_START,
     SERVICE_GET_SHIP_SUCCESS,
+    SERVICE_SNAPSHOT_LOADED,
     SERVICE_UPDATE_COMPONENT,
+    SERVICE_UPDATE_COMPONENTS_BULK,
     SERVICE_UPDATE_SHIP,
+    SERVICE_UPDATE_SHIPS_BULK,
     SHIP_NOT_FOUND_MESSAGE,
     UNKNOWN_COMPONENT_MESSAGE,
 )
-from db.logger import logger
-from db.models import Component, Engine, Hull, Ship, Weapon
-from db.repository import ComponentRepository, ShipRepository
+from db.async_repository import DatabaseExecutors, executors
+from db.columnar import ColumnarSnapshot
+from db.digest import diff_digests
+from db.logger import lazy, logger
+from db.models import (
+    COMPONENT_STRUCTURES,
+    Component,
+    ComponentChange,
+    ComponentView,
+    DatabaseDiff,
+    Engine,
+    Hull,
+    ParamChange,
+    Ship,
+    ShipView,
+    Weapon,
+)
+from db.repository import ComponentRepository, DiffRepository, ShipRepository
 
 
 class ComponentMapper:
@@ -67,99 +94,253 @@ class ComponentMapper:
         return comp_class(*row)
 
 
+@dataclass
+class Snapshot:
+    """All ships and components of a database, indexed in memory"""
+
+    db_name: str
+    ships: dict[str, Ship]
+    components: dict[tuple[str, str], Component]
+
+    @classmethod
+    def load(cls, db_name: str) -> "Snapshot":
+        ships = {row[0]: Ship(*row) for row in ShipRepository.find_all(db_name)}
+        components = {}
+        for comp_structure in COMPONENT_STRUCTURES:
+            for row in ComponentRepository.find_all(db_name, comp_structure.table_name):
+                components[(comp_structure.type, row[0])] = (
+                    ComponentMapper.create_comp_instance_from_row(
+                        comp_structure.type, row
+                    )
+                )
+
+        logger.info(
+            lazy(
+                SERVICE_SNAPSHOT_LOADED,
+                db_name=db_name,
+                ships=len(ships),
+                components=len(components),
+            )
+        )
+        return cls(db_name, ships, components)
+
+    def get_ship(self, ship_id: str) -> Ship | None:
+        return self.ships.get(ship_id)
+
+    def get_component(self, component_type: str, component_id: str) -> Component | None:
+        return self.components.get((component_type, component_id))
+
+
+# Snapshots the services read from instead of the database, by database name.
+# Updates through the services drop the snapshot of the changed database.
+snapshots: dict[str, Snapshot | ColumnarSnapshot] = {}
+
+
+def use_snapshot(db_name: str, columnar: bool = False) -> Snapshot | ColumnarSnapshot:
+    """columnar: array-backed snapshot for large fleets, rows are read-only views"""
+    snapshot = (ColumnarSnapshot if columnar else Snapshot).load(db_name)
+    snapshots[db_name] = snapshot
+    return snapshot
+
+
 class ShipService:
     def __init__(self):
         self.repository = ShipRepository()
 
-    def get_ship(self, db_name: str, ship_id: str) -> Ship:
-        logger.info(SERVICE_GET_SHIP_START.format(ship_id=ship_id, db_name=db_name))
+    def _find_ship(self, db_name: str, ship_id: str) -> ShipView | None:
+        snapshot = snapshots.get(db_name)
+        if snapshot is not None:
+            return snapshot.get_ship(ship_id)
+
+        row = self.repository.find_by_id(db_name, ship_id)
+        return Ship(*row) if row else None
+
+    def get_ship(self, db_name: str, ship_id: str) -> ShipView:
+        logger.info(lazy(SERVICE_GET_SHIP_START, ship_id=ship_id, db_name=db_name))
         try:
-            row = self.repository.find_by_id(db_name, ship_id)
-            if not row:
+            ship = self._find_ship(db_name, ship_id)
+            if ship is None:
                 error_msg = SHIP_NOT_FOUND_MESSAGE.format(ship_id=ship_id)
                 logger.error(
-                    SERVICE_GET_SHIP_ERROR.format(ship_id=ship_id, error=error_msg)
+                    lazy(SERVICE_GET_SHIP_ERROR, ship_id=ship_id, error=error_msg)
                 )
                 raise ValueError(error_msg)
 
-            ship = Ship(*row)
-            logger.info(SERVICE_GET_SHIP_SUCCESS.format(ship_id=ship_id))
+            logger.info(lazy(SERVICE_GET_SHIP_SUCCESS, ship_id=ship_id))
             return ship
         except Exception as e:
-            logger.error(SERVICE_GET_SHIP_ERROR.format(ship_id=ship_id, error=str(e)))
+            logger.error(lazy(SERVICE_GET_SHIP_ERROR, ship_id=ship_id, error=str(e)))
             raise
 
-    def get_original_ship(self, ship_id: str) -> Ship:
+    def get_original_ship(self, ship_id: str) -> ShipView:
         return self.get_ship(DB_NAME, ship_id)
 
-    def get_changed_ship(self, ship_id: str) -> Ship:
+    def get_changed_ship(self, ship_id: str) -> ShipView:
         return self.get_ship(TEMP_DB_NAME, ship_id)
 
     def get_all_ships(self, db_name: str) -> list[tuple]:
         return self.repository.find_all(db_name)
 
+    def get_ships_with_component(
+        self, db_name: str, component_type: str, component_id: str
+    ) -> list[Ship]:
+        """Ships affected by a change of the component"""
+        rows = self.repository.find_by_component(db_name, component_type, component_id)
+        return [Ship(*row) for row in rows]
+
     def update_ship_component(
         self, db_name: str, ship_id: str, component_type: str, component_id: str
     ) -> None:
         logger.info(
-            SERVICE_UPDATE_SHIP.format(
+            lazy(
+                SERVICE_UPDATE_SHIP,
                 ship_id=ship_id,
                 component_type=component_type,
                 component_id=component_id,
             )
         )
         self.repository.update_component(db_name, ship_id, component_type, component_id)
+        snapshots.pop(db_name, None)
+
+    def update_ship_components_bulk(
+        self, db_name: str, updates: list[tuple[str, str, str]]
+    ) -> None:
+        """updates: (ship_id, component_type, component_id)"""
+        logger.info(lazy(SERVICE_UPDATE_SHIPS_BULK, count=len(updates)))
+        self.repository.update_components_bulk(db_name, updates)
+        snapshots.pop(db_name, None)
+
+
+class ComponentCache:
+    """Per-database LRU cache of components with an optional TTL in seconds,
+    measured by `clock`
+    """
+
+    def __init__(
+        self,
+        max_size: int = COMPONENT_CACHE_SIZE,
+        ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: dict[str, OrderedDict[tuple[str, str], tuple]] = defaultdict(
+            OrderedDict
+        )
+        self._lock = threading.Lock()
+
+    def get(
+        self, db_name: str, component_type: str, component_id: str
+    ) -> Component | None:
+        key = (component_type, component_id)
+        with self._lock:
+            entries = self._entries[db_name]
+            entry = entries.get(key)
+            if entry is not None:
+                component, expires_at = entry
+                if expires_at is None or expires_at > self.clock():
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return component
+                del entries[key]
+
+            self.misses += 1
+            return None
+
+    def put(self, db_name: str, component_type: str, component: Component) -> None:
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            entries = self._entries[db_name]
+            entries[(component_type, component.comp_id)] = (component, expires_at)
+            entries.move_to_end((component_type, component.comp_id))
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+
+    def invalidate(self, db_name: str, component_type: str, component_id: str) -> None:
+        with self._lock:
+            self._entries[db_name].pop((component_type, component_id), None)
+
+    def clear(self, db_name: str | None = None) -> None:
+        with self._lock:
+            if db_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(db_name, None)
 
 
 class ComponentService:
     def __init__(self):
         self.repository = ComponentRepository()
+        self.cache = ComponentCache(ttl=COMPONENT_CACHE_TTL)
+
+    def _find_component(
+        self, db_name: str, component_type: str, component_id: str
+    ) -> ComponentView | None:
+        snapshot = snapshots.get(db_name)
+        if snapshot is not None:
+            return snapshot.get_component(component_type, component_id)
+
+        component = self.cache.get(db_name, component_type, component_id)
+        if component is not None:
+            logger.debug(lazy(SERVICE_COMPONENT_CACHE_HIT, component_id=component_id))
+            return component
+
+        component_table = f"{component_type}s"
+        row = self.repository.find_by_id(
+            db_name, component_table, component_type, component_id
+        )
+        if not row:
+            return None
+
+        component = ComponentMapper.create_comp_instance_from_row(component_type, row)
+        self.cache.put(db_name, component_type, component)
+        return component
 
     def get_component(
         self, db_name: str, component_type: str, component_id: str
-    ) -> Component:
+    ) -> ComponentView:
         logger.info(
-            SERVICE_GET_COMPONENT_START.format(
+            lazy(
+                SERVICE_GET_COMPONENT_START,
                 component_type=component_type,
                 component_id=component_id,
                 db_name=db_name,
             )
         )
         try:
-            component_table = f"{component_type}s"
-            row = self.repository.find_by_id(
-                db_name, component_table, component_type, component_id
-            )
-            if not row:
+            component = self._find_component(db_name, component_type, component_id)
+            if component is None:
                 error_msg = COMPONENT_NOT_FOUND_MESSAGE.format(comp_id=component_id)
                 logger.error(
-                    SERVICE_GET_COMPONENT_ERROR.format(
-                        component_id=component_id, error=error_msg
+                    lazy(
+                        SERVICE_GET_COMPONENT_ERROR,
+                        component_id=component_id,
+                        error=error_msg,
                     )
                 )
                 raise ValueError(error_msg)
 
-            component = ComponentMapper.create_comp_instance_from_row(
-                component_type, row
-            )
-            logger.info(SERVICE_GET_COMPONENT_SUCCESS.format(component_id=component_id))
+            logger.info(lazy(SERVICE_GET_COMPONENT_SUCCESS, component_id=component_id))
             return component
         except Exception as e:
             logger.error(
-                SERVICE_GET_COMPONENT_ERROR.format(
-                    component_id=component_id, error=str(e)
+                lazy(
+                    SERVICE_GET_COMPONENT_ERROR, component_id=component_id, error=str(e)
                 )
             )
             raise
 
     def get_original_component(
         self, component_type: str, component_id: str
-    ) -> Component:
+    ) -> ComponentView:
         return self.get_component(DB_NAME, component_type, component_id)
 
     def get_changed_component(
         self, component_type: str, component_id: str
-    ) -> Component:
+    ) -> ComponentView:
         return self.get_component(TEMP_DB_NAME, component_type, component_id)
 
     def get_all_components(self, db_name: str, component_table: str) -> list[tuple]:
@@ -174,8 +355,10 @@ class ComponentService:
         param_value: int,
     ) -> None:
         logger.info(
-            SERVICE_UPDATE_COMPONENT.format(
-                component_id=component_id, param_name=param_name
+            lazy(
+                SERVICE_UPDATE_COMPONENT,
+                component_id=component_id,
+                param_name=param_name,
             )
         )
         component_table = f"{component_type}s"
@@ -187,71 +370,273 @@ class ComponentService:
             param_name,
             param_value,
         )
+        self.cache.invalidate(db_name, component_type, component_id)
+        snapshots.pop(db_name, None)
+
+    def update_component_parameters_bulk(
+        self,
+        db_name: str,
+        component_type: str,
+        updates: list[tuple[str, str, int]],
+    ) -> None:
+        """updates: (component_id, param_name, param_value)"""
+        logger.info(
+            lazy(
+                SERVICE_UPDATE_COMPONENTS_BULK,
+                count=len(updates),
+                component_type=component_type,
+            )
+        )
+        component_table = f"{component_type}s"
+        self.repository.update_parameters_bulk(
+            db_name, component_table, component_type, updates
+        )
+        for component_id, *_ in updates:
+            self.cache.invalidate(db_name, component_type, component_id)
+        snapshots.pop(db_name, None)
+
+
+class AsyncShipService:
+    """ShipService lookups for async callers. They run on the worker thread of
+    their database, so lookups in both databases can be awaited at once:
+    await asyncio.gather(get_original_ship(ship_id), get_changed_ship(ship_id))
+    """
+
+    def __init__(
+        self, service: ShipService, db_executors: DatabaseExecutors = executors
+    ):
+        self.service = service
+        self.executors = db_executors
+
+    async def get_ship(self, db_name: str, ship_id: str) -> ShipView:
+        return await self.executors.run(db_name, self.service.get_ship, ship_id)
+
+    async def get_original_ship(self, ship_id: str) -> ShipView:
+        return await self.get_ship(DB_NAME, ship_id)
+
+    async def get_changed_ship(self, ship_id: str) -> ShipView:
+        return await self.get_ship(TEMP_DB_NAME, ship_id)
+
+
+class AsyncComponentService:
+    """ComponentService lookups for async callers, see AsyncShipService"""
+
+    def __init__(
+        self, service: ComponentService, db_executors: DatabaseExecutors = executors
+    ):
+        self.service = service
+        self.executors = db_executors
+
+    async def get_component(
+        self, db_name: str, component_type: str, component_id: str
+    ) -> ComponentView:
+        return await self.executors.run(
+            db_name, self.service.get_component, component_type, component_id
+        )
+
+    async def get_original_component(
+        self, component_type: str, component_id: str
+    ) -> ComponentView:
+        return await self.get_component(DB_NAME, component_type, component_id)
+
+    async def get_changed_component(
+        self, component_type: str, component_id: str
+    ) -> ComponentView:
+        return await self.get_component(TEMP_DB_NAME, component_type, component_id)
+
+
+class DiffService:
+    def __init__(self):
+        self.repository = DiffRepository()
+
+    def get_diff(
+        self,
+        db_name: str = DB_NAME,
+        other_db_name: str = TEMP_DB_NAME,
+        since_seq: int | None = None,
+        digests: bool = False,
+    ) -> DatabaseDiff:
+        """since_seq: only check rows in the changelog of other_db_name after
+        this sequence number (needs install_cdc), instead of all rows.
+        digests: only check rows whose digests differ (needs build_digests).
+        """
+        logger.info(
+            lazy(SERVICE_DIFF_START, db_name=db_name, other_db_name=other_db_name)
+        )
+        diff = DatabaseDiff()
+        changed_keys = diff_digests(db_name, other_db_name) if digests else None
+
+        components = [comp.type for comp in COMPONENT_STRUCTURES]
+        for row in self.repository.find_ship_changes(
+            db_name, other_db_name, components, since_seq, changed_keys
+        ):
+            change = ComponentChange(*row)
+            diff.component_changes[(change.ship_id, change.component_type)] = change
+
+        for comp_structure in COMPONENT_STRUCTURES:
+            params = comp_structure.params
+            for ship_id, *columns in self.repository.find_component_changes(
+                db_name, other_db_name, comp_structure, since_seq, changed_keys
+            ):
+                comp_id, *orig_values = columns[: len(params) + 1]
+                changed_values = columns[len(params) + 2 :]
+                # report the first differing parameter, as compare_component_params
+                param, orig_value, changed_value = next(
+                    values
+                    for values in zip(params, orig_values, changed_values, strict=True)
+                    if values[1] != values[2]
+                )
+                diff.param_changes[(ship_id, comp_structure.type)] = ParamChange(
+                    ship_id, comp_id, param, orig_value, changed_value
+                )
+
+        logger.info(
+            lazy(
+                SERVICE_DIFF_COMPLETE,
+                component_changes=len(diff.component_changes),
+                param_changes=len(diff.param_changes),
+            )
+        )
+        return diff
 
 
 class ComparisonService:
     @staticmethod
-    def compare_ship_components(
-        component_type: str, original_ship: Ship, changed_ship: Ship
-    ) -> None:
-        logger.debug(SERVICE_COMPARE_SHIPS_START.format(component_type=component_type))
+    def ship_components_failure(
+        component_type: str, original_ship: ShipView, changed_ship: ShipView
+    ) -> str | None:
+        """Failure message if the ships have different components of the type"""
+        logger.debug(lazy(SERVICE_COMPARE_SHIPS_START, component_type=component_type))
 
         orig_comp_id = original_ship[component_type]
         changed_comp_id = changed_ship[component_type]
 
-        if orig_comp_id != changed_comp_id:
-            logger.info(
-                SERVICE_COMPARE_SHIPS_DIFFER.format(
+        if orig_comp_id == changed_comp_id:
+            logger.debug(
+                lazy(
+                    SERVICE_COMPARE_SHIPS_MATCH,
                     component_type=component_type,
-                    orig=orig_comp_id,
-                    changed=changed_comp_id,
-                )
-            )
-            pytest.fail(
-                COMPARE_COMPONENTS_FAIL_MESSAGE.format(
-                    ship_id=original_ship.ship_id,
-                    comp=component_type,
-                    orig_comp=orig_comp_id,
-                    changed_comp=changed_comp_id,
+                    component_id=orig_comp_id,
                 )
             )
-        else:
-            logger.debug(
-                SERVICE_COMPARE_SHIPS_MATCH.format(
-                    component_type=component_type, component_id=orig_comp_id
-                )
+            return None
+
+        logger.info(
+            lazy(
+                SERVICE_COMPARE_SHIPS_DIFFER,
+                component_type=component_type,
+                orig=orig_comp_id,
+                changed=changed_comp_id,
             )
+        )
+        return COMPARE_COMPONENTS_FAIL_MESSAGE.format(
+            ship_id=original_ship.ship_id,
+            comp=component_type,
+            orig_comp=orig_comp_id,
+            changed_comp=changed_comp_id,
+        )
 
     @staticmethod
-    def compare_component_params(
-        original_component: Component, changed_component: Component, ship_id: str
-    ) -> None:
+    def component_params_failure(
+        original_component: ComponentView,
+        changed_component: ComponentView,
+        ship_id: str,
+    ) -> str | None:
+        """Failure message for the first parameter that differs"""
         comp_id = changed_component["comp_id"]
-        logger.debug(SERVICE_COMPARE_PARAMS_START.format(component_id=comp_id))
+        logger.debug(lazy(SERVICE_COMPARE_PARAMS_START, component_id=comp_id))
 
-        for field in fields(original_component):
-            param = field.name
-            value = getattr(original_component, field.name)
+        for param in original_component.keys():
+            value = original_component[param]
 
             if value != changed_component[param]:
                 logger.info(
-                    SERVICE_COMPARE_PARAMS_DIFFER.format(
+                    lazy(
+                        SERVICE_COMPARE_PARAMS_DIFFER,
                         param=param,
                         orig_value=value,
                         changed_value=changed_component[param],
                     )
                 )
-                pytest.fail(
-                    COMPARE_PARAMS_FAIL_MESSAGE.format(
-                        ship_id=ship_id,
-                        comp_id=comp_id,
-                        param=param,
-                        orig_value=value,
-                        changed_value=changed_component[param],
-                    )
+                return COMPARE_PARAMS_FAIL_MESSAGE.format(
+                    ship_id=ship_id,
+                    comp_id=comp_id,
+                    param=param,
+                    orig_value=value,
+                    changed_value=changed_component[param],
                 )
+        return None
+
+    @staticmethod
+    def compare_ship_components(
+        component_type: str, original_ship: ShipView, changed_ship: ShipView
+    ) -> None:
+        message = ComparisonService.ship_components_failure(
+            component_type, original_ship, changed_ship
+        )
+        if message is not None:
+            pytest.fail(message)
+
+    @staticmethod
+    def compare_component_params(
+        original_component: ComponentView,
+        changed_component: ComponentView,
+        ship_id: str,
+    ) -> None:
+        message = ComparisonService.component_params_failure(
+            original_component, changed_component, ship_id
+        )
+        if message is not None:
+            pytest.fail(message)
+
+    @staticmethod
+    def check_diff(diff: DatabaseDiff, ship_id: str, component_type: str) -> None:
+        """Same verdict as compare_ship_components followed by
+        compare_component_params, looked up in a precomputed diff
+        """
+        key = (ship_id, component_type)
+
+        if component_change := diff.component_changes.get(key):
+            logger.info(
+                lazy(
+                    SERVICE_COMPARE_SHIPS_DIFFER,
+                    component_type=component_type,
+                    orig=component_change.orig_comp,
+                    changed=component_change.changed_comp,
+                )
+            )
+            pytest.fail(
+                COMPARE_COMPONENTS_FAIL_MESSAGE.format(
+                    ship_id=ship_id,
+                    comp=component_type,
+                    orig_comp=component_change.orig_comp,
+                    changed_comp=component_change.changed_comp,
+                )
+            )
+
+        if param_change := diff.param_changes.get(key):
+            logger.info(
+                lazy(
+                    SERVICE_COMPARE_PARAMS_DIFFER,
+                    param=param_change.param,
+                    orig_value=param_change.orig_value,
+                    changed_value=param_change.changed_value,
+                )
+            )
+            pytest.fail(
+                COMPARE_PARAMS_FAIL_MESSAGE.format(
+                    ship_id=ship_id,
+                    comp_id=param_change.comp_id,
+                    param=param_change.param,
+                    orig_value=param_change.orig_value,
+                    changed_value=param_change.changed_value,
+                )
+            )
 
 
 ship_service = ShipService()
 component_service = ComponentService()
+diff_service = DiffService()
 comparison_service = ComparisonService()
+async_ship_service = AsyncShipService(ship_service)
+async_component_service = AsyncComponentService(component_service)
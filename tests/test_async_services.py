@@ -0,0 +1,135 @@
+import asyncio
+import threading
+from collections.abc import Callable, Generator
+
+import pytest
+
+from db.async_repository import (
+    AsyncComponentRepository,
+    AsyncShipRepository,
+    DatabaseExecutors,
+)
+from db.repository import ComponentRepository, ShipRepository
+from tests.services import (
+    AsyncComponentService,
+    AsyncShipService,
+    component_service,
+    ship_service,
+)
+
+
+@pytest.fixture
+def db_name(seeded_db: Callable[..., str]) -> str:
+    return seeded_db("async.db")
+
+
+@pytest.fixture
+def databases(seeded_db: Callable[..., str]) -> tuple[str, str]:
+    """Seeded database and a copy whose Ship-1 has another hull"""
+    db_name = seeded_db("original.db")
+    other_db_name = seeded_db("changed.db", copy_of=db_name)
+    ship = ShipRepository.find_by_id(db_name, "Ship-1")
+    assert ship is not None
+    hull = "Hull-2" if ship[2] == "Hull-1" else "Hull-1"
+    ShipRepository.update_component(other_db_name, "Ship-1", "hull", hull)
+    return db_name, other_db_name
+
+
+@pytest.fixture
+def db_executors() -> Generator[DatabaseExecutors]:
+    db_executors = DatabaseExecutors()
+    yield db_executors
+    db_executors.shutdown()
+
+
+def test_lookups_match_sync_services(
+    db_name: str, db_executors: DatabaseExecutors
+) -> None:
+    ships = AsyncShipService(ship_service, db_executors)
+    components = AsyncComponentService(component_service, db_executors)
+
+    async def lookup():
+        return await asyncio.gather(
+            ships.get_ship(db_name, "Ship-1"),
+            components.get_component(db_name, "weapon", "Weapon-1"),
+        )
+
+    ship, weapon = asyncio.run(lookup())
+
+    assert ship == ship_service.get_ship(db_name, "Ship-1")
+    assert weapon == component_service.get_component(db_name, "weapon", "Weapon-1")
+
+
+def test_missing_ship_raises(db_name: str, db_executors: DatabaseExecutors) -> None:
+    ships = AsyncShipService(ship_service, db_executors)
+
+    with pytest.raises(ValueError):
+        asyncio.run(ships.get_ship(db_name, "Ship-0"))
+
+
+def test_repositories_gather_both_databases(
+    databases: tuple[str, str], db_executors: DatabaseExecutors
+) -> None:
+    ships = AsyncShipRepository(db_executors)
+    components = AsyncComponentRepository(db_executors)
+
+    async def lookup():
+        return await asyncio.gather(
+            *(ships.find_by_id(db_name, "Ship-1") for db_name in databases),
+            *(
+                components.find_by_id(db_name, "weapons", "weapon", "Weapon-1")
+                for db_name in databases
+            ),
+        )
+
+    ship, changed_ship, weapon, changed_weapon = asyncio.run(lookup())
+
+    assert ship == ShipRepository.find_by_id(databases[0], "Ship-1")
+    assert changed_ship == ShipRepository.find_by_id(databases[1], "Ship-1")
+    assert ship != changed_ship
+    assert weapon == changed_weapon
+    assert weapon == ComponentRepository.find_by_id(
+        databases[0], "weapons", "weapon", "Weapon-1"
+    )
+
+
+def test_repositories_match_sync_repositories(
+    db_name: str, db_executors: DatabaseExecutors
+) -> None:
+    ships = AsyncShipRepository(db_executors)
+    components = AsyncComponentRepository(db_executors)
+
+    async def lookup():
+        return await asyncio.gather(
+            ships.find_all(db_name),
+            ships.find_by_component(db_name, "hull", "Hull-1"),
+            ships.find_by_id(db_name, "Ship-0"),
+            components.find_all(db_name, "engines"),
+        )
+
+    all_ships, hull_ships, missing, engines = asyncio.run(lookup())
+
+    assert all_ships == ShipRepository.find_all(db_name)
+    assert hull_ships == ShipRepository.find_by_component(db_name, "hull", "Hull-1")
+    assert missing is None
+    assert engines == ComponentRepository.find_all(db_name, "engines")
+
+
+def test_databases_run_on_their_own_threads(
+    databases: tuple[str, str], db_executors: DatabaseExecutors
+) -> None:
+    # both calls must be running at once to get past the barrier
+    barrier = threading.Barrier(len(databases), timeout=5)
+
+    def worker_thread(db_name: str) -> int:
+        barrier.wait()
+        return threading.get_ident()
+
+    async def run():
+        return await asyncio.gather(
+            *(db_executors.run(db_name, worker_thread) for db_name in databases)
+        )
+
+    threads = asyncio.run(run())
+
+    assert len(set(threads)) == len(databases)
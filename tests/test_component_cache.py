@@ -0,0 +1,105 @@
+from collections.abc import Callable
+
+import pytest
+
+from config import MAX_PARAM_VALUE
+from db.models import Engine
+from tests.services import ComponentCache, component_service
+
+DB = "cache.db"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _engine(number: int) -> Engine:
+    return Engine(f"Engine-{number}", number, 1)
+
+
+def test_least_recently_used_entry_is_evicted() -> None:
+    cache = ComponentCache(max_size=2)
+    cache.put(DB, "engine", _engine(1))
+    cache.put(DB, "engine", _engine(2))
+    assert cache.get(DB, "engine", "Engine-1") == _engine(1)
+
+    cache.put(DB, "engine", _engine(3))
+
+    assert cache.get(DB, "engine", "Engine-2") is None
+    assert cache.get(DB, "engine", "Engine-1") == _engine(1)
+    assert cache.get(DB, "engine", "Engine-3") == _engine(3)
+
+
+def test_entries_expire_after_ttl() -> None:
+    clock = Clock()
+    cache = ComponentCache(ttl=10, clock=clock)
+    cache.put(DB, "engine", _engine(1))
+
+    clock.now = 9.5
+    assert cache.get(DB, "engine", "Engine-1") == _engine(1)
+    clock.now = 10
+    assert cache.get(DB, "engine", "Engine-1") is None
+
+    # an expired entry is dropped, not refreshed by the clock going back
+    clock.now = 0
+    assert cache.get(DB, "engine", "Engine-1") is None
+
+
+def test_entries_without_ttl_never_expire() -> None:
+    clock = Clock()
+    cache = ComponentCache(clock=clock)
+    cache.put(DB, "engine", _engine(1))
+
+    clock.now = 1e9
+    assert cache.get(DB, "engine", "Engine-1") == _engine(1)
+
+
+def test_hits_and_misses_are_counted() -> None:
+    cache = ComponentCache()
+    cache.get(DB, "engine", "Engine-1")
+    cache.put(DB, "engine", _engine(1))
+    cache.get(DB, "engine", "Engine-1")
+    cache.get(DB, "engine", "Engine-1")
+    cache.get(DB, "hull", "Engine-1")
+
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_databases_are_cached_separately() -> None:
+    cache = ComponentCache()
+    cache.put(DB, "engine", _engine(1))
+    cache.put("other.db", "engine", _engine(1))
+
+    cache.invalidate(DB, "engine", "Engine-1")
+    assert cache.get(DB, "engine", "Engine-1") is None
+    assert cache.get("other.db", "engine", "Engine-1") == _engine(1)
+
+    cache.clear("other.db")
+    assert cache.get("other.db", "engine", "Engine-1") is None
+
+
+@pytest.mark.parametrize("bulk", [False, True], ids=["single", "bulk"])
+def test_service_updates_invalidate_cached_components(
+    seeded_db: Callable[..., str], bulk: bool
+) -> None:
+    db_name = seeded_db("cache.db")
+    component_service.get_component(db_name, "weapon", "Weapon-1")
+    assert component_service.cache.get(db_name, "weapon", "Weapon-1") is not None
+    count = MAX_PARAM_VALUE + 1
+
+    if bulk:
+        component_service.update_component_parameters_bulk(
+            db_name, "weapon", [("Weapon-1", "count", count)]
+        )
+    else:
+        component_service.update_component_parameter(
+            db_name, "weapon", "Weapon-1", "count", count
+        )
+
+    assert component_service.cache.get(db_name, "weapon", "Weapon-1") is None
+    weapon = component_service.get_component(db_name, "weapon", "Weapon-1")
+    assert weapon["count"] == count
@@ -0,0 +1,282 @@
+import sqlite3
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from db.conn_db import ConnectionPool, conn_db, connect, get_cursor, pool
+from db.repository import ShipRepository
+
+
+@pytest.fixture
+def db_name(seeded_db: Callable[..., str]) -> str:
+    return seeded_db("pool.db", seed=None)
+
+
+def _pragma(db_name: str, pragma: str) -> int:
+    with get_cursor(db_name) as cursor:
+        (value,) = cursor.execute(f"PRAGMA {pragma}").fetchone()
+    return value
+
+
+def test_connections_are_reused_per_database_and_mode(db_name: str) -> None:
+    with conn_db(db_name) as writer:
+        pass
+    with conn_db(db_name, read_only=True) as reader:
+        pass
+
+    assert reader is not writer
+    with conn_db(db_name) as next_writer:
+        assert next_writer is writer
+    with conn_db(db_name, read_only=True) as next_reader:
+        assert next_reader is reader
+
+
+def test_only_idle_connections_are_bounded(db_name: str) -> None:
+    test_pool = ConnectionPool(max_size=2)
+    connections = [test_pool.acquire(db_name) for _ in range(5)]
+    assert len(set(connections)) == 5
+
+    for conn in connections:
+        test_pool.release(db_name, conn)
+
+    kept = [test_pool.acquire(db_name) for _ in range(2)]
+    assert set(kept) == set(connections[:2])
+    for conn in connections[2:]:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+    for conn in kept:
+        test_pool.release(db_name, conn)
+    test_pool.close_all()
+
+
+@pytest.mark.parametrize("breakage", ["closed", "in_transaction"])
+def test_unhealthy_connection_is_replaced(db_name: str, breakage: str) -> None:
+    test_pool = ConnectionPool()
+    conn = test_pool.acquire(db_name)
+    if breakage == "closed":
+        conn.close()  # SELECT 1 fails
+    else:
+        conn.execute("BEGIN")
+    test_pool.release(db_name, conn)
+
+    replacement = test_pool.acquire(db_name)
+
+    assert replacement is not conn
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    test_pool.release(db_name, replacement)
+    test_pool.close_all()
+
+
+def test_close_all_closes_idle_connections(
+    seeded_db: Callable[..., str],
+) -> None:
+    db_names = [seeded_db(f"pool-{i}.db", seed=None) for i in range(2)]
+    test_pool = ConnectionPool()
+    connections = []
+    for db_name in db_names:
+        for read_only in (False, True):
+            conn = test_pool.acquire(db_name, read_only)
+            test_pool.release(db_name, conn, read_only)
+            connections.append(conn)
+
+    test_pool.close_all()
+
+    for conn in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+    conn = test_pool.acquire(db_names[0])
+    assert conn not in connections
+    test_pool.release(db_names[0], conn)
+    test_pool.close_all()
+
+
+def test_unknown_profile_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Unknown PRAGMA profile: fast"):
+        ConnectionPool(profile="fast")
+    with pytest.raises(ValueError, match="Unknown PRAGMA profile: fast"):
+        with pool.use_profile("fast"):
+            pass
+
+
+def test_profile_applies_to_checked_out_connections(db_name: str) -> None:
+    with pool.use_profile("durable"):
+        assert _pragma(db_name, "synchronous") == 2  # FULL
+        with pool.use_profile("bulk-load"):
+            assert _pragma(db_name, "synchronous") == 0  # OFF
+        assert _pragma(db_name, "synchronous") == 2
+
+
+def test_profile_is_scoped_to_the_calling_thread(db_name: str) -> None:
+    test_pool = ConnectionPool(profile="durable")
+    entered, checked = threading.Event(), threading.Event()
+    bulk_load_synchronous = []
+
+    def bulk_load() -> None:
+        with test_pool.use_profile("bulk-load"):
+            conn = test_pool.acquire(db_name)
+            (value,) = conn.execute("PRAGMA synchronous").fetchone()
+            bulk_load_synchronous.append(value)
+            test_pool.release(db_name, conn)
+            entered.set()
+            checked.wait()
+
+    thread = threading.Thread(target=bulk_load)
+    thread.start()
+    entered.wait()
+    # checked out while the other thread is inside its block
+    conn = test_pool.acquire(db_name)
+    (synchronous,) = conn.execute("PRAGMA synchronous").fetchone()
+    test_pool.release(db_name, conn)
+    checked.set()
+    thread.join()
+    test_pool.close_all()
+
+    assert bulk_load_synchronous == [0]  # OFF
+    assert synchronous == 2  # FULL
+
+
+def test_durable_profile_leaves_foreign_keys_off(db_name: str) -> None:
+    with pool.use_profile("durable"):
+        with get_cursor(db_name) as cursor:
+            cursor.execute(
+                "INSERT INTO ships VALUES ('Ship-1', 'Weapon-1', NULL, NULL)"
+            )
+
+        assert _pragma(db_name, "foreign_keys") == 0
+
+
+def _insert_ships(db_name: str, first: int, count: int) -> None:
+    with get_cursor(db_name) as cursor:
+        cursor.executemany(
+            "INSERT INTO ships VALUES (?, 'Weapon-1', 'Hull-1', 'Engine-1')",
+            [(f"Ship-{i}",) for i in range(first, first + count)],
+        )
+
+
+def _count_ships(db_name: str) -> int:
+    with get_cursor(db_name, read_only=True) as cursor:
+        (count,) = cursor.execute("SELECT COUNT(*) FROM ships").fetchone()
+    return count
+
+
+def test_readers_are_reused_across_writes(db_name: str) -> None:
+    _insert_ships(db_name, 1, 10)
+    with conn_db(db_name, read_only=True) as reader:
+        pass
+
+    _insert_ships(db_name, 11, 5000)
+
+    with conn_db(db_name, read_only=True) as next_reader:
+        assert next_reader is reader
+        (count,) = next_reader.execute("SELECT COUNT(*) FROM ships").fetchone()
+    assert count == 5010
+
+
+def test_interleaved_writes_and_reads_reuse_connections(
+    db_name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _insert_ships(db_name, 1, 1)
+    pool.close(db_name)
+    opened = []
+
+    def counting_connect(*args) -> sqlite3.Connection:
+        opened.append(args)
+        return connect(*args)
+
+    monkeypatch.setattr("db.conn_db.connect", counting_connect)
+    for i in range(100):
+        ShipRepository.update_component(db_name, "Ship-1", "hull", f"Hull-{i}")
+        ship = ShipRepository.find_by_id(db_name, "Ship-1")
+        assert ship is not None and ship[2] == f"Hull-{i}"
+
+    # one read-write and one read-only connection
+    assert len(opened) == 2
+
+
+def test_reads_see_whole_commits(db_name: str) -> None:
+    _insert_ships(db_name, 1, 200)
+    done = threading.Event()
+
+    def write() -> None:
+        for i in range(50):
+            with get_cursor(db_name) as cursor:
+                cursor.execute("UPDATE ships SET hull = ?", (f"Hull-{i}",))
+        done.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    torn = 0
+    while not done.is_set():
+        ships = ShipRepository.find_all(db_name)
+        torn += len({hull for _, _, hull, _ in ships}) > 1
+    writer.join()
+
+    assert torn == 0
+
+
+def test_immutable_reader_checked_out_during_write_is_not_reused(
+    db_name: str,
+) -> None:
+    _insert_ships(db_name, 1, 10)
+
+    with pool.immutable_reads(db_name):
+        assert _count_ships(db_name) == 10
+        with conn_db(db_name, read_only=True) as reader:
+            # enough rows to move pages the immutable reader has cached
+            _insert_ships(db_name, 11, 5000)
+
+        assert _count_ships(db_name) == 5010
+        with conn_db(db_name, read_only=True) as next_reader:
+            assert next_reader is not reader
+
+
+def test_immutable_readers_are_closed_after_the_block(db_name: str) -> None:
+    with conn_db(db_name, read_only=True) as reader:
+        pass
+
+    with pool.immutable_reads(db_name):
+        with conn_db(db_name, read_only=True) as immutable_reader:
+            assert immutable_reader is not reader
+        with conn_db(db_name, read_only=True) as next_reader:
+            assert next_reader is immutable_reader
+
+    with conn_db(db_name, read_only=True) as next_reader:
+        assert next_reader is not immutable_reader
+
+
+def test_immutable_reads_checkpoint_on_entry(db_name: str) -> None:
+    wal = Path(f"{db_name}-wal")
+    with pool.use_profile("read-heavy"):
+        _insert_ships(db_name, 1, 10)
+        assert wal.stat().st_size
+
+        # before any reader, e.g. of a process spawned inside the block
+        with pool.immutable_reads(db_name):
+            assert not wal.stat().st_size
+
+
+def test_immutable_readers_see_the_wal(db_name: str) -> None:
+    with pool.use_profile("read-heavy"), pool.immutable_reads(db_name):
+        _insert_ships(db_name, 1, 10)
+        assert Path(f"{db_name}-wal").stat().st_size
+
+        # concurrent first readers after the write share one checkpoint
+        with ThreadPoolExecutor(4) as executor:
+            counts = list(executor.map(_count_ships, [db_name] * 4))
+
+    assert counts == [10] * 4
+
+
+def test_reader_of_missing_database_creates_no_file(tmp_path: Path) -> None:
+    db_name = str(tmp_path / "missing.db")
+
+    with pytest.raises(sqlite3.OperationalError):
+        _count_ships(db_name)
+
+    assert not Path(db_name).exists()
+    pool.close(db_name)
@@ -0,0 +1,193 @@
+from collections.abc import Callable
+
+import pytest
+
+from config import COMPONENTS, MAX_PARAM_VALUE, SHIPS_COUNT
+from db.conn_db import pool
+from db.create_db import install_cdc
+from db.models import COMPONENT_STRUCTURES, DatabaseDiff
+from db.repository import ChangelogRepository, DiffRepository
+from db.utils import DataGenerator
+from tests.randomize import RandomizeDatabase
+from tests.services import (
+    comparison_service,
+    component_service,
+    diff_service,
+    ship_service,
+)
+from tests.verification import VerificationEngine
+
+SEED = 3
+
+Verdicts = dict[tuple[str, str], str | None]
+
+
+def _verdict(check: Callable, *args) -> str | None:
+    """Failure message of a ComparisonService check, None if it passes"""
+    try:
+        check(*args)
+    except pytest.fail.Exception as e:
+        return str(e)
+    return None
+
+
+@pytest.fixture
+def databases(seeded_db: Callable[..., str]) -> tuple[str, str]:
+    """Seeded database and a copy with change data capture whose ships and
+    weapons are randomized. Hulls and engines keep their parameters, so
+    ships that keep them pass.
+    """
+    db_name = seeded_db("original.db", SEED)
+    other_db_name = seeded_db("changed.db", copy_of=db_name)
+    install_cdc(other_db_name)
+    randomize_db = RandomizeDatabase(
+        other_db_name, DataGenerator(SEED, stream="randomize")
+    )
+    with pool.use_profile("bulk-load"):
+        randomize_db.randomize_ships()
+        component_service.update_component_parameters_bulk(
+            other_db_name,
+            "weapon",
+            [
+                (component_id, "count", MAX_PARAM_VALUE + 1)
+                for component_id, *_ in component_service.get_all_components(
+                    other_db_name, "weapons"
+                )
+            ],
+        )
+
+    return db_name, other_db_name
+
+
+@pytest.fixture
+def row_verdicts(databases: tuple[str, str]) -> Verdicts:
+    """Verdicts of the per-row checks test_differences_in_databases ran
+    before it used DiffService
+    """
+    db_name, other_db_name = databases
+    verdicts = {}
+    for i in range(1, SHIPS_COUNT + 1):
+        ship_id = f"Ship-{i}"
+        original_ship = ship_service.get_ship(db_name, ship_id)
+        changed_ship = ship_service.get_ship(other_db_name, ship_id)
+        for component_type in COMPONENTS:
+            component_id = original_ship[component_type]
+            verdicts[(ship_id, component_type)] = _verdict(
+                comparison_service.compare_ship_components,
+                component_type,
+                original_ship,
+                changed_ship,
+            ) or _verdict(
+                comparison_service.compare_component_params,
+                component_service.get_component(db_name, component_type, component_id),
+                component_service.get_component(
+                    other_db_name, component_type, component_id
+                ),
+                ship_id,
+            )
+    return verdicts
+
+
+def _get_diff(mode: str, db_name: str, other_db_name: str) -> DatabaseDiff:
+    if mode == "vectorized":
+        pytest.importorskip("numpy")
+        from db.vectorized import compare_databases
+
+        return compare_databases(db_name, other_db_name).to_database_diff()
+    return diff_service.get_diff(
+        db_name, other_db_name, since_seq=0 if mode == "cdc" else None
+    )
+
+
+@pytest.mark.parametrize("mode", ["full", "cdc", "vectorized"])
+def test_diff_matches_row_comparison(
+    mode: str, databases: tuple[str, str], row_verdicts: Verdicts
+) -> None:
+    """check_diff on a precomputed diff fails exactly where, and with the
+    same message as, the per-row ship and component comparison
+    """
+    diff = _get_diff(mode, *databases)
+
+    verdicts = {
+        (ship_id, component_type): _verdict(
+            comparison_service.check_diff, diff, ship_id, component_type
+        )
+        for ship_id, component_type in row_verdicts
+    }
+
+    assert verdicts == row_verdicts
+    # the randomized copy must exercise both outcomes
+    assert None in row_verdicts.values()
+    assert any(row_verdicts.values())
+
+
+@pytest.mark.parametrize("processes", [False, True], ids=["threads", "processes"])
+def test_verification_matches_row_comparison(
+    processes: bool, databases: tuple[str, str], row_verdicts: Verdicts
+) -> None:
+    report = VerificationEngine(*databases, workers=2, processes=processes).run()
+
+    assert report.checks == len(row_verdicts)
+    assert {
+        (failure.ship_id, failure.component_type): failure.message
+        for failure in report.failures
+    } == {key: message for key, message in row_verdicts.items() if message}
+
+
+def test_changelog_returns_keys_written_since_a_sequence_number(
+    seeded_db: Callable[..., str],
+) -> None:
+    db_name = seeded_db("changelog.db")
+    install_cdc(db_name)
+    assert ChangelogRepository.last_seq(db_name) == 0
+
+    ship_service.update_ship_component(db_name, "Ship-1", "hull", "Hull-1")
+    seq = ChangelogRepository.last_seq(db_name)
+    assert seq == 1
+
+    ship_service.update_ship_components_bulk(
+        db_name, [("Ship-2", "hull", "Hull-1"), ("Ship-3", "engine", "Engine-1")]
+    )
+    component_service.update_component_parameter(
+        db_name, "weapon", "Weapon-3", "count", MAX_PARAM_VALUE + 1
+    )
+
+    assert ChangelogRepository.last_seq(db_name) == seq + 3
+    assert sorted(
+        (table, row_key, operation)
+        for _, table, row_key, operation in ChangelogRepository.find_since(db_name, seq)
+    ) == [
+        ("ships", "Ship-2", "UPDATE"),
+        ("ships", "Ship-3", "UPDATE"),
+        ("weapons", "Weapon-3", "UPDATE"),
+    ]
+    assert ChangelogRepository.find_changed_keys(db_name, seq) == {
+        "ships": {"Ship-2", "Ship-3"},
+        "weapons": {"Weapon-3"},
+    }
+    assert ChangelogRepository.find_changed_keys(db_name) == {
+        "ships": {"Ship-1", "Ship-2", "Ship-3"},
+        "weapons": {"Weapon-3"},
+    }
+    assert ChangelogRepository.find_since(db_name, seq + 3) == []
+
+
+def test_changelog_diff_matches_diff_of_changed_keys(
+    databases: tuple[str, str],
+) -> None:
+    """The since_seq filter compares the rows find_changed_keys returns"""
+    db_name, other_db_name = databases
+    changed_keys = ChangelogRepository.find_changed_keys(other_db_name)
+    components = [structure.type for structure in COMPONENT_STRUCTURES]
+
+    assert DiffRepository.find_ship_changes(
+        db_name, other_db_name, components, since_seq=0
+    ) == DiffRepository.find_ship_changes(
+        db_name, other_db_name, components, changed_keys=changed_keys
+    )
+    for structure in COMPONENT_STRUCTURES:
+        assert DiffRepository.find_component_changes(
+            db_name, other_db_name, structure, since_seq=0
+        ) == DiffRepository.find_component_changes(
+            db_name, other_db_name, structure, changed_keys=changed_keys
+        )
@@ -0,0 +1,99 @@
+from collections.abc import Callable
+
+import pytest
+
+from config import MAX_PARAM_VALUE
+from db.conn_db import get_cursor
+from db.digest import MerkleTree, build_digests, diff_digests
+from db.repository import ComponentRepository, ShipRepository
+from db.utils import drop_db_if_exists
+from tests.services import diff_service, ship_service
+
+
+@pytest.fixture
+def databases(seeded_db: Callable[..., str]) -> tuple[str, str]:
+    """Seeded database with digests and an unchanged copy"""
+    db_name = seeded_db("original.db")
+    build_digests(db_name)
+    return db_name, seeded_db("changed.db", copy_of=db_name)
+
+
+def _change(db_name: str) -> None:
+    """Change the hull of Ship-1 and a parameter of Weapon-3"""
+    hull = ship_service.get_ship(db_name, "Ship-1")["hull"]
+    ShipRepository.update_component(
+        db_name, "Ship-1", "hull", "Hull-2" if hull == "Hull-1" else "Hull-1"
+    )
+    ComponentRepository.update_parameter(
+        db_name, "weapons", "weapon", "Weapon-3", "count", MAX_PARAM_VALUE + 1
+    )
+
+
+def _digests(db_name: str) -> tuple[list, list]:
+    with get_cursor(db_name, read_only=True) as cursor:
+        rows = cursor.execute("SELECT * FROM row_digests ORDER BY 1, 2").fetchall()
+        buckets = cursor.execute(
+            "SELECT * FROM bucket_digests ORDER BY 1, 2"
+        ).fetchall()
+    return rows, buckets
+
+
+def test_unchanged_trees_are_equal(databases: tuple[str, str]) -> None:
+    db_name, other_db_name = databases
+    tree = MerkleTree.load(db_name, "ships")
+
+    assert tree.root == MerkleTree.load(other_db_name, "ships").root
+    assert tree.diff_buckets(MerkleTree.load(other_db_name, "ships")) == []
+    assert diff_digests(db_name, other_db_name) == {}
+
+
+def test_writes_keep_digests_current(databases: tuple[str, str]) -> None:
+    db_name, other_db_name = databases
+    _change(other_db_name)
+
+    assert diff_digests(db_name, other_db_name) == {
+        "ships": {"Ship-1"},
+        "weapons": {"Weapon-3"},
+    }
+
+    maintained = _digests(other_db_name)
+    build_digests(other_db_name)
+    assert _digests(other_db_name) == maintained
+
+
+def test_digest_diff_matches_full_diff(databases: tuple[str, str]) -> None:
+    _change(databases[1])
+
+    assert diff_service.get_diff(*databases, digests=True) == diff_service.get_diff(
+        *databases
+    )
+
+
+def test_digests_built_after_writes_are_kept_current(
+    seeded_db: Callable[..., str],
+) -> None:
+    db_name = seeded_db("late.db")
+    # remembered by the pool as a database without digests
+    _change(db_name)
+
+    build_digests(db_name)
+    built = _digests(db_name)
+    _change(db_name)
+
+    assert _digests(db_name) != built
+    maintained = _digests(db_name)
+    build_digests(db_name)
+    assert _digests(db_name) == maintained
+
+
+def test_dropped_database_forgets_its_digests(
+    seeded_db: Callable[..., str],
+) -> None:
+    db_name = seeded_db("dropped.db")
+    build_digests(db_name)
+    _change(db_name)
+    drop_db_if_exists(db_name)
+
+    # same name, no digest tables: writes must not look for them
+    db_name = seeded_db("dropped.db")
+    _change(db_name)
@@ -0,0 +1,75 @@
+import logging
+from collections.abc import Generator
+from logging.handlers import QueueHandler
+from pathlib import Path
+
+import pytest
+
+from config import LOG_FILE
+from db import logger as db_logger
+from db.logger import lazy, setup_logger, stop_listener
+
+
+class CountingTemplate(str):
+    """Template counting how often it is formatted"""
+
+    formatted = 0
+
+    def format(self, *args, **kwargs) -> str:
+        CountingTemplate.formatted += 1
+        return super().format(*args, **kwargs)
+
+
+@pytest.fixture
+def log_file(tmp_path: Path) -> Generator[Path]:
+    """File of a logger set up like the WG one, which is restored afterwards:
+    there is one listener per process
+    """
+    log_file = tmp_path / "test.log"
+    yield log_file
+    stop_listener()
+    setup_logger(log_file=str(LOG_FILE))
+
+
+def test_lazy_message_is_formatted_only_when_emitted(log_file: Path) -> None:
+    logger = setup_logger("WG-test", level=logging.INFO, log_file=str(log_file))
+    template = CountingTemplate("Ship {ship_id}")
+    CountingTemplate.formatted = 0
+
+    logger.debug(lazy(template, ship_id="Ship-1"))
+    assert CountingTemplate.formatted == 0
+
+    logger.info(lazy(template, ship_id="Ship-2"))
+    stop_listener()
+    # once per handler, pytest's log capture included
+    assert CountingTemplate.formatted > 0
+    assert "Ship Ship-2" in log_file.read_text()
+    assert "Ship-1" not in log_file.read_text()
+
+
+def test_records_reach_the_file_through_the_listener(log_file: Path) -> None:
+    logger = setup_logger("WG-test", log_file=str(log_file))
+
+    assert [type(handler) for handler in logger.handlers] == [QueueHandler]
+    assert db_logger._listener is not None
+    [file_handler] = db_logger._listener.handlers
+    assert isinstance(file_handler, logging.FileHandler)
+
+    logger.info(lazy("Removed temporary database: {db_name}", db_name="temp.db"))
+    stop_listener()
+
+    assert "INFO - Removed temporary database: temp.db" in log_file.read_text()
+
+
+def test_stop_listener_flushes_the_queue(log_file: Path) -> None:
+    logger = setup_logger("WG-test", log_file=str(log_file))
+
+    for i in range(1000):
+        logger.info(lazy("record {i}", i=i))
+    stop_listener()
+
+    lines = log_file.read_text().splitlines()
+    assert [line.rsplit(" - ", 1)[1] for line in lines] == [
+        f"record {i}" for i in range(1000)
+    ]
+    assert db_logger._listener is None
@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+from collections.abc import Callable, Generator
+
+import pytest
+
+from config import PROJECT_ROOT
+from db.conn_db import get_cursor, is_memory_db, pool
+from db.create_db import create_db
+from db.repository import ComponentRepository, ShipRepository
+from db.seed_db import seed_db
+from db.tmp_db import create_tmp_db
+from db.utils import DataGenerator, drop_db_if_exists
+
+
+@pytest.fixture
+def memory_db(request: pytest.FixtureRequest) -> Generator[Callable[[str], str]]:
+    """Factory of shared-cache in-memory database names unique to the test,
+    dropped after it
+    """
+    db_names = []
+
+    def name(suffix: str) -> str:
+        db_name = f"file:{request.node.name}_{suffix}?mode=memory&cache=shared"
+        db_names.append(db_name)
+        return db_name
+
+    yield name
+
+    for db_name in db_names:
+        drop_db_if_exists(db_name)
+
+
+def _tables(db_name: str) -> list[str]:
+    with get_cursor(db_name, read_only=True) as cursor:
+        rows = cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+        ).fetchall()
+    return [name for (name,) in rows]
+
+
+def test_memory_storage_uses_shared_cache_databases() -> None:
+    env = {**os.environ, "WOW_DB_STORAGE": "memory"}
+    names = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import config; print(config.DB_NAME, config.TEMP_DB_NAME)",
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+
+    assert len(names) == 2
+    assert all(is_memory_db(name) and "cache=shared" in name for name in names)
+
+
+def test_anchor_keeps_database_between_checkouts(
+    memory_db: Callable[[str], str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # every released connection is closed, only the anchor stays open
+    monkeypatch.setattr(pool, "max_size", 0)
+    db_name = memory_db("anchored")
+
+    create_db(db_name)
+
+    assert _tables(db_name) == ["engines", "hulls", "ships", "weapons"]
+
+
+def test_drop_releases_the_database(memory_db: Callable[[str], str]) -> None:
+    db_name = memory_db("dropped")
+    create_db(db_name)
+
+    drop_db_if_exists(db_name)
+
+    assert _tables(db_name) == []
+
+
+def test_copy_between_memory_databases(memory_db: Callable[[str], str]) -> None:
+    db_name, tmp_db_name = memory_db("original"), memory_db("copy")
+    create_db(db_name)
+    seed_db(db_name, DataGenerator(1, stream="seed"))
+
+    create_tmp_db(db_name, tmp_db_name, pages=2, progress=None)
+
+    assert ShipRepository.find_all(tmp_db_name) == ShipRepository.find_all(db_name)
+    assert ComponentRepository.find_all(
+        tmp_db_name, "weapons"
+    ) == ComponentRepository.find_all(db_name, "weapons")
+    assert len(ShipRepository.find_all(tmp_db_name)) > 0
@@ -0,0 +1,112 @@
+import sqlite3
+
+import pytest
+
+from db import metrics
+from db.metrics import (
+    COUNTERS,
+    Histogram,
+    InstrumentedConnection,
+    MetricsRegistry,
+    normalize_sql,
+)
+
+
+@pytest.fixture
+def registry(monkeypatch: pytest.MonkeyPatch) -> MetricsRegistry:
+    """Fresh registry for instrumented connections, the session's is kept"""
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    return registry
+
+
+def test_normalize_sql() -> None:
+    assert (
+        normalize_sql("SELECT *\n  FROM ships WHERE ship = 'Ship-1''s'  AND n > 2.5")
+        == "SELECT * FROM ships WHERE ship = ? AND n > ?"
+    )
+    # digits inside identifiers are kept
+    assert (
+        normalize_sql("SELECT t1.a FROM t1 LIMIT 10") == "SELECT t1.a FROM t1 LIMIT ?"
+    )
+
+
+def test_instrumented_connection_counts(registry: MetricsRegistry) -> None:
+    conn = sqlite3.connect(":memory:", factory=InstrumentedConnection)
+    conn.execute("CREATE TABLE t (n INTEGER)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    conn.commit()
+
+    cursor = conn.cursor()
+    assert len(cursor.execute("SELECT n FROM t").fetchall()) == 3
+    cursor.execute("SELECT n FROM t WHERE n = 1").fetchone()
+    cursor.execute("SELECT n FROM t WHERE n = 0").fetchone()
+    assert len(list(cursor.execute("SELECT n FROM t"))) == 3
+    conn.execute("INSERT INTO t VALUES (4)")
+    conn.rollback()
+    conn.close()
+    conn.close()
+
+    counters = registry.to_dict()["counters"]
+    assert counters == {
+        "connects": 1,
+        "closes": 1,
+        "commits": 1,
+        "rollbacks": 1,
+        "statements": 7,
+        "rows_fetched": 7,
+    }
+    assert registry.connection_lifetime.count == 1
+    assert registry.statements["SELECT n FROM t WHERE n = ?"].count == 2
+
+
+def test_histogram_buckets() -> None:
+    histogram = Histogram((1.0, 2.0))
+    for value in (0.5, 1.0, 1.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.cumulative() == [("1.0", 2), ("2.0", 3), ("+Inf", 4)]
+    assert (histogram.count, histogram.total) == (4, 6.0)
+
+
+def test_counters_exist_while_zero() -> None:
+    registry = MetricsRegistry()
+    assert registry.to_dict()["counters"] == dict.fromkeys(COUNTERS, 0)
+    assert "wow_db_rollbacks_total 0" in registry.to_prometheus().splitlines()
+
+    registry.increment("rollbacks")
+    registry.reset()
+    assert registry.to_dict()["counters"]["rollbacks"] == 0
+
+
+def test_prometheus_format(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics, "LATENCY_BUCKETS", (0.1,))
+    monkeypatch.setattr(metrics, "LIFETIME_BUCKETS", (1.0,))
+    registry = MetricsRegistry()
+    registry.increment("commits", 2)
+    registry.observe_connection(0.5)
+    registry.observe_statement('SELECT "a" FROM t WHERE n = 5', 0.05)
+    registry.observe_statement('SELECT "a" FROM t WHERE n = 6', 0.5)
+
+    lines = registry.to_prometheus().splitlines()
+    label = 'sql="SELECT \\"a\\" FROM t WHERE n = ?"'
+
+    assert lines[lines.index("# TYPE wow_db_commits_total counter") + 1] == (
+        "wow_db_commits_total 2"
+    )
+    histograms = lines[
+        lines.index("# TYPE wow_db_connection_lifetime_seconds histogram") :
+    ]
+    assert histograms == [
+        "# TYPE wow_db_connection_lifetime_seconds histogram",
+        'wow_db_connection_lifetime_seconds_bucket{le="1.0"} 1',
+        'wow_db_connection_lifetime_seconds_bucket{le="+Inf"} 1',
+        "wow_db_connection_lifetime_seconds_sum 0.5",
+        "wow_db_connection_lifetime_seconds_count 1",
+        "# TYPE wow_db_statement_seconds histogram",
+        f'wow_db_statement_seconds_bucket{{{label},le="0.1"}} 1',
+        f'wow_db_statement_seconds_bucket{{{label},le="+Inf"}} 2',
+        f"wow_db_statement_seconds_sum{{{label}}} 0.55",
+        f"wow_db_statement_seconds_count{{{label}}} 2",
+    ]
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from config import DB_NAME, PROJECT_ROOT
+from db.repository import ComponentRepository, ShipRepository
+from tests.profiling import DbProfiler
+
+
+def test_same_named_methods_are_reported_separately(tmp_path: Path) -> None:
+    profiler = DbProfiler(tmp_path / "profile")
+    profiler.profile.enable()
+    for _ in range(3):
+        ShipRepository.find_by_id(DB_NAME, "Ship-1")
+    ComponentRepository.find_by_id(DB_NAME, "weapons", "weapon", "Weapon-1")
+    profiler.profile.disable()
+
+    lookups = [line for line in profiler._summarize() if "(find_by_id)" in line]
+
+    assert len(lookups) == 2
+    assert all(line.lstrip().startswith("db/repository.py:") for line in lookups)
+    assert sorted(int(line.split()[1]) for line in lookups) == [1, 3]
+
+
+@pytest.fixture
+def profile_dir(pytester: pytest.Pytester, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Where a pytest run in pytester.path with the plugin loaded profiles to"""
+    profile_dir = pytester.path / "profile"
+    monkeypatch.setenv("WOW_PROFILE_DIR", str(profile_dir))
+    monkeypatch.setenv("PYTHONPATH", str(PROJECT_ROOT))
+    # not an xdist worker, even when this session is
+    monkeypatch.delenv("PYTEST_XDIST_WORKER", raising=False)
+    pytester.makepyfile(
+        """
+        import pytest
+
+        @pytest.fixture
+        def ship():
+            return "Ship-1"
+
+        def test_ship(ship):
+            assert ship == "Ship-1"
+        """
+    )
+    return profile_dir
+
+
+def test_profile_db_option_is_registered(
+    pytester: pytest.Pytester, profile_dir: Path
+) -> None:
+    result = pytester.runpytest_subprocess("-p", "tests.profiling", "--help")
+
+    result.stdout.fnmatch_lines(["*--profile-db*"])
+
+
+def test_profiling_is_off_without_the_option(
+    pytester: pytest.Pytester, profile_dir: Path
+) -> None:
+    result = pytester.runpytest_subprocess("-p", "tests.profiling")
+
+    result.assert_outcomes(passed=1)
+    assert "database profile" not in result.stdout.str()
+    assert not profile_dir.exists()
+
+
+def test_profile_db_writes_the_profile(
+    pytester: pytest.Pytester, profile_dir: Path
+) -> None:
+    result = pytester.runpytest_subprocess("-p", "tests.profiling", "--profile-db")
+
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["*database profile*", "phases:"])
+    assert (profile_dir / "db_profile.prof").stat().st_size
+    summary = (profile_dir / "db_profile.txt").read_text().splitlines()
+    assert [line.split()[0] for line in summary[1:4]] == ["setup", "call", "teardown"]
+    assert "fixture setup:" in summary
+    assert any(line.split()[0] == "ship" for line in summary if line.startswith("  "))
@@ -0,0 +1,64 @@
+from collections.abc import Callable
+
+import pytest
+
+from config import COMPONENTS
+from db.conn_db import get_cursor
+from db.create_db import SCHEMA_VERSION, Indexes, get_schema_version, migrate_db
+from db.repository import ShipRepository
+
+
+def _indexes(db_name: str) -> set[str]:
+    with get_cursor(db_name, read_only=True) as cursor:
+        rows = cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'ships'"
+            " AND sql IS NOT NULL"
+        ).fetchall()
+    return {name for (name,) in rows}
+
+
+def test_version_0_database_is_migrated(seeded_db: Callable[..., str]) -> None:
+    db_name = seeded_db("v0.db", migrate=False)
+    assert get_schema_version(db_name) == 0
+    assert _indexes(db_name) == set()
+    ships = ShipRepository.find_all(db_name)
+
+    migrate_db(db_name)
+    migrate_db(db_name)
+
+    assert get_schema_version(db_name) == SCHEMA_VERSION == 1
+    assert _indexes(db_name) == {index.name for index in Indexes}
+    assert ShipRepository.find_all(db_name) == ships
+
+
+@pytest.mark.parametrize("without_rowid", [False, True], ids=["rowid", "without_rowid"])
+def test_find_by_component(seeded_db: Callable[..., str], without_rowid: bool) -> None:
+    db_name = seeded_db("ships.db", without_rowid=without_rowid)
+    ships = ShipRepository.find_all(db_name)
+
+    for position, component in enumerate(COMPONENTS, start=1):
+        component_id = ships[0][position]
+        expected = [ship for ship in ships if ship[position] == component_id]
+        assert sorted(
+            ShipRepository.find_by_component(db_name, component, component_id)
+        ) == sorted(expected)
+
+        with get_cursor(db_name, read_only=True) as cursor:
+            plan = cursor.execute(
+                f"EXPLAIN QUERY PLAN SELECT * FROM ships WHERE {component} = ?",
+                (component_id,),
+            ).fetchall()
+        assert f"INDEX ships_{component}" in str(plan)
+
+    assert ShipRepository.find_by_component(db_name, "hull", "Hull-0") == []
+
+
+def test_without_rowid_tables(seeded_db: Callable[..., str]) -> None:
+    db_name = seeded_db("clustered.db", seed=None, without_rowid=True)
+
+    with get_cursor(db_name, read_only=True) as cursor:
+        ddl = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table'"
+        ).fetchall()
+
+    assert ddl and all(sql.endswith("WITHOUT ROWID") for (sql,) in ddl)
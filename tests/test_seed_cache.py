@@ -0,0 +1,92 @@
+from collections.abc import Callable, Generator
+from pathlib import Path
+
+import pytest
+
+from db import cache
+from db.cache import create_seeded_db, seeded_db_key
+from db.repository import ComponentRepository, ShipRepository
+from db.utils import DataGenerator, drop_db_if_exists
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    cache_dir = tmp_path / "cache"
+    monkeypatch.setattr(cache, "SEED_CACHE_DIR", cache_dir)
+    return cache_dir
+
+
+@pytest.fixture
+def db_name(tmp_path: Path) -> Generator[str]:
+    db_name = str(tmp_path / "seeded.db")
+    yield db_name
+    drop_db_if_exists(db_name)
+
+
+def _contents(db_name: str) -> tuple[list, list]:
+    return ShipRepository.find_all(db_name), ComponentRepository.find_all(
+        db_name, "weapons"
+    )
+
+
+def test_key_depends_on_seed() -> None:
+    assert seeded_db_key(1) == seeded_db_key(1)
+    assert seeded_db_key(1) != seeded_db_key(2)
+
+
+def test_uncached_seed_stores_nothing(
+    cache_dir: Path, db_name: str, seeded_db: Callable[..., str]
+) -> None:
+    create_seeded_db(db_name, DataGenerator(1, stream="seed"), cache=False)
+
+    assert _contents(db_name) == _contents(seeded_db("reference.db", 1))
+    assert not cache_dir.exists()
+
+
+def test_cached_seed_is_restored(cache_dir: Path, db_name: str) -> None:
+    create_seeded_db(db_name, DataGenerator(1, stream="seed"))
+    seeded = _contents(db_name)
+    assert [path.name for path in cache_dir.glob("*.db")] == [f"{seeded_db_key(1)}.db"]
+
+    drop_db_if_exists(db_name)
+    assert cache.restore_seeded_db(seeded_db_key(1), db_name)
+    assert _contents(db_name) == seeded
+
+
+def test_database_pruned_before_restore_is_a_miss(
+    cache_dir: Path, db_name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    create_seeded_db(db_name, DataGenerator(1, stream="seed"))
+    path = cache.cached_db_path(seeded_db_key(1))
+    backup_db = cache.backup_db
+
+    def pruned_backup_db(*args, **kwargs) -> None:
+        # another worker prunes the cache between the lookup and the copy
+        path.unlink()
+        backup_db(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "backup_db", pruned_backup_db)
+
+    assert not cache.restore_seeded_db(seeded_db_key(1), db_name)
+    assert not path.exists()
+    assert not Path(db_name).exists()
+
+
+def test_prune_ignores_files_removed_meanwhile(
+    cache_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache_dir.mkdir()
+    paths = [cache_dir / f"{i}.db" for i in range(cache.SEED_CACHE_MAX_FILES + 2)]
+    for path in paths:
+        path.touch()
+    glob = Path.glob
+
+    def racing_glob(self: Path, pattern: str) -> list[Path]:
+        found = list(glob(self, pattern))
+        found[0].unlink()  # removed by another worker before stat()
+        return found
+
+    monkeypatch.setattr(Path, "glob", racing_glob)
+    cache._prune_cache()
+
+    assert len(list(cache_dir.iterdir())) == cache.SEED_CACHE_MAX_FILES
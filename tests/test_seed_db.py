@@ -0,0 +1,51 @@
+import sqlite3
+from collections.abc import Callable
+
+import pytest
+
+from config import SHIPS_COUNT, WEAPONS_COUNT
+from db.repository import ComponentRepository, ShipRepository
+from db.seed_db import insert_chunked, seed_db
+from db.utils import DataGenerator
+
+CHUNK_SIZE = 7
+
+
+def _contents(db_name: str) -> list[list[tuple]]:
+    return [
+        ShipRepository.find_all(db_name),
+        *(
+            ComponentRepository.find_all(db_name, table)
+            for table in ("weapons", "hulls", "engines")
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "count", [0, 1, CHUNK_SIZE, 2 * CHUNK_SIZE, 2 * CHUNK_SIZE + 3]
+)
+def test_insert_chunked_inserts_every_row(count: int) -> None:
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE items (id INTEGER, name TEXT)")
+        rows = [(i, f"item-{i}") for i in range(count)]
+
+        insert_chunked(conn.cursor(), "items", iter(rows), CHUNK_SIZE)
+
+        assert conn.execute("SELECT * FROM items ORDER BY id").fetchall() == rows
+    finally:
+        conn.close()
+
+
+def test_chunked_seed_matches_unchunked_seed(seeded_db: Callable[..., str]) -> None:
+    # chunk boundaries fall inside the ships and weapons
+    assert SHIPS_COUNT > CHUNK_SIZE and WEAPONS_COUNT > CHUNK_SIZE
+    db_name = seeded_db("unchunked.db", seed=None)
+    chunked_db_name = seeded_db("chunked.db", seed=None)
+
+    seed_db(db_name, DataGenerator(1, stream="seed"))
+    seed_db(chunked_db_name, DataGenerator(1, stream="seed"), chunk_size=CHUNK_SIZE)
+
+    contents = _contents(chunked_db_name)
+    assert contents == _contents(db_name)
+    assert [len(rows) for rows in contents[:2]] == [SHIPS_COUNT, WEAPONS_COUNT]
@@ -0,0 +1,106 @@
+from collections.abc import Callable
+
+import pytest
+
+from config import MAX_PARAM_VALUE, SHIPS_COUNT
+from db.columnar import ColumnarSnapshot
+from db.repository import ComponentRepository, ShipRepository
+from tests.services import component_service, ship_service, snapshots, use_snapshot
+
+SHIP_FIELDS = ("ship_id", "weapon", "hull", "engine")
+
+
+@pytest.fixture
+def db_name(seeded_db: Callable[..., str]) -> str:
+    return seeded_db("snapshot.db")
+
+
+def _fail(*args) -> None:
+    raise AssertionError("lookup reached the repository")
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_lookups_are_served_from_the_snapshot(
+    db_name: str, columnar: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ship = ship_service.get_ship(db_name, "Ship-1")
+    weapon = component_service.get_component(db_name, "weapon", "Weapon-1")
+    component_service.cache.clear(db_name)
+
+    use_snapshot(db_name, columnar)
+    monkeypatch.setattr(ship_service.repository, "find_by_id", _fail)
+    monkeypatch.setattr(component_service.repository, "find_by_id", _fail)
+    monkeypatch.setattr(component_service.cache, "get", _fail)
+
+    snapshot_ship = ship_service.get_ship(db_name, "Ship-1")
+    snapshot_weapon = component_service.get_component(db_name, "weapon", "Weapon-1")
+    assert [snapshot_ship[name] for name in SHIP_FIELDS] == [
+        ship[name] for name in SHIP_FIELDS
+    ]
+    assert snapshot_weapon.keys() == weapon.keys()
+    assert [snapshot_weapon[key] for key in weapon.keys()] == [
+        weapon[key] for key in weapon.keys()
+    ]
+
+
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_missing_rows_raise(db_name: str, columnar: bool) -> None:
+    use_snapshot(db_name, columnar)
+
+    with pytest.raises(ValueError, match="Ship not found: Ship-0"):
+        ship_service.get_ship(db_name, "Ship-0")
+    with pytest.raises(ValueError, match="Component not found: Weapon-0"):
+        component_service.get_component(db_name, "weapon", "Weapon-0")
+
+
+@pytest.mark.parametrize("bulk", [False, True], ids=["single", "bulk"])
+def test_ship_updates_drop_the_snapshot(db_name: str, bulk: bool) -> None:
+    use_snapshot(db_name)
+    current = ship_service.get_ship(db_name, "Ship-1")["hull"]
+    hull = "Hull-2" if current == "Hull-1" else "Hull-1"
+
+    if bulk:
+        ship_service.update_ship_components_bulk(db_name, [("Ship-1", "hull", hull)])
+    else:
+        ship_service.update_ship_component(db_name, "Ship-1", "hull", hull)
+
+    assert db_name not in snapshots
+    assert ship_service.get_ship(db_name, "Ship-1")["hull"] == hull
+
+
+@pytest.mark.parametrize("bulk", [False, True], ids=["single", "bulk"])
+def test_component_updates_drop_the_snapshot(db_name: str, bulk: bool) -> None:
+    use_snapshot(db_name)
+    count = MAX_PARAM_VALUE + 1
+
+    if bulk:
+        component_service.update_component_parameters_bulk(
+            db_name, "weapon", [("Weapon-1", "count", count)]
+        )
+    else:
+        component_service.update_component_parameter(
+            db_name, "weapon", "Weapon-1", "count", count
+        )
+
+    assert db_name not in snapshots
+    weapon = component_service.get_component(db_name, "weapon", "Weapon-1")
+    assert weapon["count"] == count
+
+
+def test_columnar_load_streams_rows_in_batches(
+    db_name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(ShipRepository, "find_all", _fail)
+    monkeypatch.setattr(ComponentRepository, "find_all", _fail)
+
+    snapshot = ColumnarSnapshot.load(db_name, batch_size=7)
+
+    assert len(snapshot.ships) == SHIPS_COUNT
+    for ship_id, *component_ids in ShipRepository.iter_all(db_name):
+        ship = snapshot.get_ship(ship_id)
+        assert ship is not None
+        assert [ship[name] for name in SHIP_FIELDS] == [ship_id, *component_ids]
+    for weapon_id, *params in ComponentRepository.iter_all(db_name, "weapons", 3):
+        weapon = snapshot.get_component("weapon", weapon_id)
+        assert weapon is not None
+        assert [weapon[key] for key in weapon.keys()] == [weapon_id, *params]
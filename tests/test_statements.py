@@ -0,0 +1,80 @@
+import pytest
+
+from config import DB_NAME, TEMP_DB_NAME
+from db.models import COMPONENT_STRUCTURES, ComponentStructure
+from db.repository import DiffRepository
+from db.statements import STATEMENT_CACHE_HEADROOM, StatementRegistry, statements
+
+
+def test_unknown_names_raise() -> None:
+    with pytest.raises(ValueError, match="Unknown component: 'cannon'"):
+        statements.ships.by_component("cannon")
+    with pytest.raises(ValueError, match="Unknown component: 'cannon'"):
+        statements.ships.update("cannon")
+    with pytest.raises(ValueError, match="Unknown component: 'cannons'"):
+        statements.component("cannons")
+    with pytest.raises(ValueError, match="Unknown component: 'hull'"):
+        statements.component("weapons", "hull")
+    with pytest.raises(ValueError, match="Unknown parameter 'armor' of weapons"):
+        statements.component("weapons").update("armor")
+    with pytest.raises(ValueError, match="Unknown component: 'cannon'"):
+        statements.diff.ships("cannon", False, False)
+    with pytest.raises(ValueError, match="Unknown component: 'cannons'"):
+        statements.diff.components("cannons", True, False)
+    with pytest.raises(ValueError, match="Unknown component: 'ship'"):
+        statements.table("ship")
+
+
+def test_diff_rejects_unknown_components_before_sql() -> None:
+    # no database is opened, the lookup fails first
+    with pytest.raises(ValueError, match="Unknown component: 'weapon, 1'"):
+        DiffRepository.find_ship_changes(DB_NAME, TEMP_DB_NAME, ["hull", "weapon, 1"])
+
+
+def test_diff_filters_are_bound() -> None:
+    for structure in COMPONENT_STRUCTURES:
+        sql = statements.diff.components(structure.table_name, True, True)
+        assert sql.count("?") == 2
+        assert sql.endswith("IN (SELECT value FROM json_each(?))")
+
+
+@pytest.mark.parametrize(
+    "structure",
+    [
+        ComponentStructure("weapon", ["count"], "weapons; DROP TABLE ships", 1),
+        ComponentStructure("weapon", ["count = 0"], "weapons", 1),
+        ComponentStructure("Weapon", ["count"], "weapons", 1),
+    ],
+    ids=["table", "param", "key"],
+)
+def test_invalid_identifiers_are_rejected(structure: ComponentStructure) -> None:
+    with pytest.raises(ValueError, match="Invalid SQL identifier"):
+        StatementRegistry([structure])
+
+
+def test_lookups_return_the_same_string() -> None:
+    for structure in COMPONENT_STRUCTURES:
+        assert statements.ships.by_component(
+            structure.type
+        ) is statements.ships.by_component(structure.type)
+        component = statements.component(structure.table_name, structure.type)
+        assert component is statements.component(structure.table_name)
+        assert statements.table(structure.table_name) is component
+        for param in structure.params:
+            assert component.update(param) is component.update(param)
+
+
+def test_cache_size_fits_every_statement() -> None:
+    registry = StatementRegistry()
+    ships = registry.ships
+    registered = {ships.find_by_id, ships.find_all}
+    registered |= {*ships.find_by_component.values(), *ships.update_component.values()}
+    for component in registry.components.values():
+        registered |= {component.find_by_id, component.find_all}
+        registered |= set(component.update_parameter.values())
+    diff = registry.diff
+    registered |= {diff.attach, diff.detach}
+    registered |= {*diff.ship_changes.values(), *diff.component_changes.values()}
+
+    assert len(registry) == len(registered)
+    assert registry.cache_size == len(registered) + STATEMENT_CACHE_HEADROOM
@@ -0,0 +1,49 @@
+import sqlite3
+from collections.abc import Callable
+
+from db.conn_db import conn_db
+from db.tmp_db import backup_db, snapshot_to_memory
+
+
+def _dump(conn: sqlite3.Connection) -> list[str]:
+    return list(conn.iterdump())
+
+
+def test_backup_in_small_steps_reports_progress(
+    seeded_db: Callable[..., str],
+) -> None:
+    db_name = seeded_db()
+    steps = []
+    target = sqlite3.connect(":memory:")
+    try:
+        backup_db(db_name, target, pages=2, progress=lambda *step: steps.append(step))
+        with conn_db(db_name, read_only=True) as source:
+            (page_count,) = source.execute("PRAGMA page_count").fetchone()
+            assert _dump(target) == _dump(source)
+    finally:
+        target.close()
+
+    # one call per step of 2 pages, counting down to the last one
+    assert page_count > 2
+    assert len(steps) == (page_count + 1) // 2
+    assert [remaining for _, remaining, _ in steps] == sorted(
+        (remaining for _, remaining, _ in steps), reverse=True
+    )
+    assert steps[-1][1] == 0
+    assert {total for _, _, total in steps} == {page_count}
+
+
+def test_snapshot_to_memory_copies_the_whole_database(
+    seeded_db: Callable[..., str],
+) -> None:
+    db_name = seeded_db()
+    snapshot = snapshot_to_memory(db_name, pages=1, progress=None)
+    try:
+        with conn_db(db_name, read_only=True) as source:
+            assert _dump(snapshot) == _dump(source)
+        (tables,) = snapshot.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table'"
+        ).fetchone()
+        assert tables > 1
+    finally:
+        snapshot.close()
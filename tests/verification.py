@@ -0,0 +1,225 @@
+"""Parallel verification of a changed database outside of pytest.
+
+Ship IDs are split into contiguous shards checked by a thread or process
+pool. Both versions of a ship are fetched once, then every component type
+gets the same checks as test_differences_in_databases, by the
+ComparisonService rules, and the shard reports are merged into one.
+
+Run from the project root: python -m tests.verification [--processes]
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from config import COMPONENTS, DB_NAME, TEMP_DB_NAME
+from constants import (
+    VERIFY_COMPLETE,
+    VERIFY_MEMORY_DB_PROCESSES,
+    VERIFY_SHARD_COMPLETE,
+    VERIFY_START,
+)
+from db.conn_db import is_memory_db, pool
+from db.logger import lazy, logger
+from tests.services import comparison_service, component_service, ship_service
+
+
+@dataclass(frozen=True)
+class VerificationFailure:
+    ship_id: str
+    component_type: str
+    message: str
+
+
+@dataclass
+class VerificationReport:
+    checks: int = 0
+    failures: list[VerificationFailure] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    def merge(self, other: "VerificationReport") -> None:
+        self.checks += other.checks
+        self.failures.extend(other.failures)
+
+
+def verify_components(
+    db_name: str, other_db_name: str, ship_id: str, component_type: str, comp_id: str
+) -> str | None:
+    """Failure message of the ship's component parameters, None if unchanged"""
+    try:
+        original_component = component_service.get_component(
+            db_name, component_type, comp_id
+        )
+        changed_component = component_service.get_component(
+            other_db_name, component_type, comp_id
+        )
+    except ValueError as e:
+        return str(e)
+    return comparison_service.component_params_failure(
+        original_component, changed_component, ship_id
+    )
+
+
+def verify_ship(
+    db_name: str, other_db_name: str, ship_id: str
+) -> list[VerificationFailure]:
+    """Failures of every component type of one ship, fetching both ships once"""
+    try:
+        original_ship = ship_service.get_ship(db_name, ship_id)
+        changed_ship = ship_service.get_ship(other_db_name, ship_id)
+    except ValueError as e:
+        return [
+            VerificationFailure(ship_id, component_type, str(e))
+            for component_type in COMPONENTS
+        ]
+
+    failures = []
+    for component_type in COMPONENTS:
+        message = comparison_service.ship_components_failure(
+            component_type, original_ship, changed_ship
+        ) or verify_components(
+            db_name,
+            other_db_name,
+            ship_id,
+            component_type,
+            original_ship[component_type],
+        )
+        if message is not None:
+            failures.append(VerificationFailure(ship_id, component_type, message))
+    return failures
+
+
+def verify_shard(
+    db_name: str, other_db_name: str, ship_ids: list[str]
+) -> VerificationReport:
+    """Check a shard of ships; runs in a worker thread or process"""
+    report = VerificationReport()
+    # spawned processes have pools of their own
+    with pool.immutable_reads(db_name, other_db_name):
+        for ship_id in ship_ids:
+            report.checks += len(COMPONENTS)
+            report.failures.extend(verify_ship(db_name, other_db_name, ship_id))
+
+    logger.info(
+        lazy(
+            VERIFY_SHARD_COMPLETE,
+            ships=len(ship_ids),
+            first=ship_ids[0],
+            last=ship_ids[-1],
+            failures=len(report.failures),
+        )
+    )
+    return report
+
+
+def split_shards(ship_ids: list[str], shards: int) -> list[list[str]]:
+    size = max(1, -(-len(ship_ids) // shards))
+    return [ship_ids[i : i + size] for i in range(0, len(ship_ids), size)]
+
+
+class VerificationEngine:
+    """Checks every ship of `other_db_name` against `db_name` in parallel.
+
+    Threads share the connection pool, each check holding its own pooled
+    read-only connections. Processes are spawned with pools of their own,
+    so in-memory databases can only be verified with threads. Both
+    databases are read immutable and must not be written meanwhile.
+    """
+
+    def __init__(
+        self,
+        db_name: str = DB_NAME,
+        other_db_name: str = TEMP_DB_NAME,
+        workers: int | None = None,
+        processes: bool = False,
+        shards_per_worker: int = 4,
+    ):
+        if processes:
+            for name in (db_name, other_db_name):
+                if is_memory_db(name):
+                    raise ValueError(VERIFY_MEMORY_DB_PROCESSES.format(db_name=name))
+
+        self.db_name = db_name
+        self.other_db_name = other_db_name
+        self.workers = workers or multiprocessing.cpu_count()
+        self.processes = processes
+        self.shards_per_worker = shards_per_worker
+
+    def _executor(self) -> Executor:
+        if self.processes:
+            return ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return ThreadPoolExecutor(self.workers)
+
+    def run(self) -> VerificationReport:
+        start = time.perf_counter()
+        ship_ids = sorted(
+            (row[0] for row in ship_service.get_all_ships(self.db_name)),
+            key=lambda ship_id: int(ship_id.rpartition("-")[2]),
+        )
+        shards = split_shards(ship_ids, self.workers * self.shards_per_worker)
+        logger.info(
+            lazy(
+                VERIFY_START,
+                ships=len(ship_ids),
+                db_name=self.db_name,
+                other_db_name=self.other_db_name,
+                shards=len(shards),
+                workers=self.workers,
+                executor="process" if self.processes else "thread",
+            )
+        )
+
+        report = VerificationReport()
+        with (
+            pool.immutable_reads(self.db_name, self.other_db_name),
+            self._executor() as executor,
+        ):
+            for shard_report in executor.map(
+                verify_shard,
+                [self.db_name] * len(shards),
+                [self.other_db_name] * len(shards),
+                shards,
+            ):
+                report.merge(shard_report)
+
+        logger.info(
+            lazy(
+                VERIFY_COMPLETE,
+                checks=report.checks,
+                elapsed=time.perf_counter() - start,
+                failures=len(report.failures),
+            )
+        )
+        return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--db", default=DB_NAME, help="original database")
+    parser.add_argument("--other-db", default=TEMP_DB_NAME, help="changed database")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--processes", action="store_true", help="use processes instead of threads"
+    )
+    args = parser.parse_args()
+
+    report = VerificationEngine(
+        args.db, args.other_db, args.workers, args.processes
+    ).run()
+    for failure in report.failures:
+        print(failure.message)
+    print(f"{report.checks} checks, {len(report.failures)} failures")
+    raise SystemExit(0 if report.passed else 1)
+
+
+if __name__ == "__main__":
+    main()